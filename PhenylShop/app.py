@@ -1,79 +1,18 @@
+import os
+import sys
 import streamlit as st
-import sqlite3
-import pandas as pd
+
+# Shares the data-access layer (db.py) with the main app one folder up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db import add_product, get_products, get_product_by_name, place_order, get_orders
 
 st.set_page_config(page_title="Phenyl Shop", page_icon="🧴", layout="wide")
 
-# ---------------- DATABASE ----------------
-conn = sqlite3.connect("phenyl_shop.db", check_same_thread=False)
-cur = conn.cursor()
-
-
-
-# Create tables
-cur.execute("""
-CREATE TABLE IF NOT EXISTS products(
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT,
-    price INTEGER,
-    stock INTEGER
-)
-""")
-
-cur.execute("""
-CREATE TABLE IF NOT EXISTS orders(
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    customer_name TEXT,
-    phone TEXT,
-    address TEXT,
-    pincode TEXT,
-    product TEXT,
-    quantity INTEGER,
-    total_price INTEGER,
-    payment_method TEXT,
-    upi_id TEXT
-
-
-)
-""")
-
-conn.commit()
-
-# ---------------- FUNCTIONS ----------------
-def add_product(name, price, stock):
-    cur.execute("INSERT INTO products(name, price, stock) VALUES(?,?,?)", (name, price, stock))
-    conn.commit()
-
-def get_products():
-    cur.execute("SELECT * FROM products")
-    return cur.fetchall()
-
-def place_order(customer_name, phone, address, pincode, product, quantity, total_price, payment_method, upi_id):
-    cur.execute("""INSERT INTO orders(customer_name, phone, address, pincode, product, quantity, total_price, payment_method, upi_id)
-                   VALUES(?,?,?,?,?,?,?,?,?)""",
-                (customer_name, phone, address, pincode, product, quantity, total_price, payment_method, upi_id))
-    conn.commit()
-
-    cur.execute("INSERT INTO orders(customer_name, phone, product, quantity, total_price) VALUES(?,?,?,?,?)",
-                (customer_name, phone, product, quantity, total_price))
-    conn.commit()
-
-def get_orders():
-    cur.execute("SELECT * FROM orders")
-    return cur.fetchall()
-
-def update_stock(product_name, quantity):
-    cur.execute("UPDATE products SET stock = stock - ? WHERE name = ?", (quantity, product_name))
-    conn.commit()
-
-# Insert default products if empty
-cur.execute("SELECT COUNT(*) FROM products")
-count = cur.fetchone()[0]
-
-if count == 0:
-    add_product("Lemon Phenyl", 80, 50)
-    add_product("Pine Phenyl", 90, 40)
-    add_product("Rose Phenyl", 85, 30)
+# ---------------- TABLES ----------------
+# pandas is imported on first use, so pages without a table never load it
+def show_table(rows, columns):
+    import pandas as pd
+    st.dataframe(pd.DataFrame(rows, columns=columns), width="stretch")
 
 # ---------------- UI ----------------
 st.title("🧴 TAMILAN CHEMICAL Shop Website")
@@ -89,8 +28,7 @@ if choice == "Home":
     st.markdown("## 🛒 Available Products")
 
     products = get_products()
-    df = pd.DataFrame(products, columns=["ID", "Product Name", "Price (₹)", "Stock (L)"])
-    st.dataframe(df, use_container_width=True)
+    show_table(products, ["ID", "Product Name", "Price (₹)", "Stock (L)"])
 
 # ---------------- CUSTOMER ORDER ----------------
 elif choice == "Customer Order":
@@ -114,7 +52,7 @@ elif choice == "Customer Order":
     quantity = st.number_input("Quantity (Liters)", min_value=1, max_value=100)
 
     # Get price and stock
-    selected_data = [p for p in products if p[1] == selected_product][0]
+    selected_data = get_product_by_name(selected_product)
     price = selected_data[2]
     stock = selected_data[3]
 
@@ -130,10 +68,13 @@ elif choice == "Customer Order":
         elif quantity > stock:
             st.error("❌ Stock not available for this quantity!")
         else:
-            place_order(name, phone, address, pincode, selected_product, quantity, total_price, payment_method, upi_id)
-            update_stock(selected_product, quantity)
-            st.success("🎉 Order placed successfully!")
-            st.balloons()
+            # Stock is re-checked inside the order transaction
+            order_id = place_order(name, phone, address, pincode, selected_data[0], quantity, total_price, payment_method, upi_id)
+            if order_id is None:
+                st.error("❌ Stock not available for this quantity!")
+            else:
+                st.success("🎉 Order placed successfully!")
+                st.balloons()
 
 # ---------------- ADMIN LOGIN ----------------
 elif choice == "Admin Login":
@@ -168,22 +109,22 @@ elif choice == "Admin Login":
                 if pname == "":
                     st.error("❌ Product Name must be filled!")
                 else:
-                    add_product(pname, pprice, pstock)
-                    st.success("✅ Product Added Successfully!")
+                    if add_product(pname, pprice, pstock) is None:
+                        st.error("❌ A product with this name already exists!")
+                    else:
+                        st.success("✅ Product Added Successfully!")
 
         # View Products
         elif admin_menu == "View Products":
             st.subheader("📋 Product List")
             products = get_products()
-            df = pd.DataFrame(products, columns=["ID", "Product Name", "Price (₹)", "Stock (L)"])
-            st.dataframe(df, use_container_width=True)
+            show_table(products, ["ID", "Product Name", "Price (₹)", "Stock (L)"])
 
         # View Orders
         elif admin_menu == "View Orders":
             st.subheader("📦 Customer Orders List")
             orders = get_orders()
-            df = pd.DataFrame(orders, columns=["ID", "Customer Name", "Phone", "Product", "Quantity", "Total Price"])
-            st.dataframe(df, use_container_width=True)
+            show_table(orders, ["ID", "Customer Name", "Phone", "Address", "Pincode", "Product", "Quantity", "Total Price", "Payment Method", "UPI ID", "Order Time", "Delivery"])
 
 
             # Add Product
@@ -195,22 +136,22 @@ elif choice == "Admin Login":
                 pstock = st.number_input("Stock (Liters)", min_value=1)
 
                 if st.button("Add Product Now"):
-                    add_product(pname, pprice, pstock)
-                    st.success("✅ Product Added Successfully!")
+                    if add_product(pname, pprice, pstock) is None:
+                        st.error("❌ A product with this name already exists!")
+                    else:
+                        st.success("✅ Product Added Successfully!")
 
             # View Products
             elif admin_menu == "View Products":
                 st.subheader("📋 Product List")
                 products = get_products()
-                df = pd.DataFrame(products, columns=["ID", "Product Name", "Price (₹)", "Stock (L)"])
-                st.dataframe(df, use_container_width=True)
+                show_table(products, ["ID", "Product Name", "Price (₹)", "Stock (L)"])
 
             # View Orders
             elif admin_menu == "View Orders":
                 st.subheader("📦 Customer Orders List")
                 orders = get_orders()
-                df = pd.DataFrame(orders, columns=["ID", "Customer Name", "Phone", "Product", "Quantity", "Total Price"])
-                st.dataframe(df, use_container_width=True)
+                show_table(orders, ["ID", "Customer Name", "Phone", "Address", "Pincode", "Product", "Quantity", "Total Price", "Payment Method", "UPI ID", "Order Time", "Delivery"])
 
         else:
             st.error("❌ Invalid Admin Username or Password!")
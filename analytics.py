@@ -0,0 +1,118 @@
+import sys
+import time
+from db import get_pool, fetchall
+from archive import ARCHIVE_ALIAS, list_archives, fetch_archive
+
+# ---------------- SALES ANALYTICS ----------------
+# The dashboard reads only the sales_* summary tables, which db.place_order
+# updates in the same transaction as each order. Their size depends on the
+# number of days shown, not on the number of orders.
+
+
+# Aggregates per day from an orders table (hot, or an attached archive)
+DAILY_SQL = """
+    SELECT date(created_at), COUNT(*), COALESCE(SUM(quantity), 0), COALESCE(SUM(total_price), 0)
+    FROM {table} WHERE created_at IS NOT NULL
+    GROUP BY date(created_at)
+"""
+PRODUCT_DAILY_SQL = """
+    SELECT date(created_at), COALESCE(product, 'Unknown'), COUNT(*),
+           COALESCE(SUM(quantity), 0), COALESCE(SUM(total_price), 0)
+    FROM {table} WHERE created_at IS NOT NULL
+    GROUP BY date(created_at), COALESCE(product, 'Unknown')
+"""
+PAYMENT_DAILY_SQL = """
+    SELECT date(created_at), COALESCE(payment_method, 'Unknown'), COUNT(*), COALESCE(SUM(total_price), 0)
+    FROM {table} WHERE created_at IS NOT NULL
+    GROUP BY date(created_at), COALESCE(payment_method, 'Unknown')
+"""
+
+
+def _archived_sales():
+    # Read before the rebuild transaction: archives cannot be attached inside one
+    daily, product, payment = [], [], []
+    table = f"{ARCHIVE_ALIAS}.orders"
+    for _, path in list_archives():
+        daily += fetch_archive(path, DAILY_SQL.format(table=table))
+        product += fetch_archive(path, PRODUCT_DAILY_SQL.format(table=table))
+        payment += fetch_archive(path, PAYMENT_DAILY_SQL.format(table=table))
+    return daily, product, payment
+
+
+def rebuild_sales_summary():
+    # Backfills the aggregates from orders, including archived ones, e.g.
+    # after upgrading an old database. Runs in one transaction; returns the
+    # number of days rebuilt.
+    daily, product, payment = _archived_sales()
+    with get_pool().write() as conn:
+        conn.execute("DELETE FROM sales_daily")
+        conn.execute("DELETE FROM sales_product_daily")
+        conn.execute("DELETE FROM sales_payment_daily")
+
+        conn.execute("INSERT INTO sales_daily(day, orders, litres, revenue)" + DAILY_SQL.format(table="orders"))
+        conn.execute("INSERT INTO sales_product_daily(day, product, orders, litres, revenue)"
+                     + PRODUCT_DAILY_SQL.format(table="orders"))
+        conn.execute("INSERT INTO sales_payment_daily(day, payment_method, orders, revenue)"
+                     + PAYMENT_DAILY_SQL.format(table="orders"))
+
+        # Added on top of any hot rows for the same day
+        conn.executemany("""
+            INSERT INTO sales_daily(day, orders, litres, revenue) VALUES(?,?,?,?)
+            ON CONFLICT(day) DO UPDATE SET
+                orders = orders + excluded.orders,
+                litres = litres + excluded.litres,
+                revenue = revenue + excluded.revenue
+        """, daily)
+        conn.executemany("""
+            INSERT INTO sales_product_daily(day, product, orders, litres, revenue) VALUES(?,?,?,?,?)
+            ON CONFLICT(day, product) DO UPDATE SET
+                orders = orders + excluded.orders,
+                litres = litres + excluded.litres,
+                revenue = revenue + excluded.revenue
+        """, product)
+        conn.executemany("""
+            INSERT INTO sales_payment_daily(day, payment_method, orders, revenue) VALUES(?,?,?,?)
+            ON CONFLICT(day, payment_method) DO UPDATE SET
+                orders = orders + excluded.orders,
+                revenue = revenue + excluded.revenue
+        """, payment)
+        return conn.execute("SELECT COUNT(*) FROM sales_daily").fetchone()[0]
+
+
+def get_sales_totals(date_from, date_to):
+    return fetchall("""
+        SELECT COALESCE(SUM(orders), 0), COALESCE(SUM(litres), 0), COALESCE(SUM(revenue), 0)
+        FROM sales_daily WHERE day BETWEEN ? AND ?
+    """, (date_from.isoformat(), date_to.isoformat()))[0]
+
+
+def get_daily_sales(date_from, date_to):
+    return fetchall("""
+        SELECT day, orders, litres, revenue FROM sales_daily
+        WHERE day BETWEEN ? AND ? ORDER BY day
+    """, (date_from.isoformat(), date_to.isoformat()))
+
+
+def get_product_sales(date_from, date_to):
+    return fetchall("""
+        SELECT product, SUM(orders), SUM(litres), SUM(revenue) FROM sales_product_daily
+        WHERE day BETWEEN ? AND ? GROUP BY product ORDER BY SUM(revenue) DESC
+    """, (date_from.isoformat(), date_to.isoformat()))
+
+
+def get_payment_sales(date_from, date_to):
+    return fetchall("""
+        SELECT payment_method, SUM(orders), SUM(revenue) FROM sales_payment_daily
+        WHERE day BETWEEN ? AND ? GROUP BY payment_method ORDER BY SUM(orders) DESC
+    """, (date_from.isoformat(), date_to.isoformat()))
+
+
+# ---------------- COMMAND LINE ----------------
+# python analytics.py rebuild
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        print("Usage: python analytics.py rebuild")
+        sys.exit(1)
+    start = time.perf_counter()
+    days = rebuild_sales_summary()
+    print(f"Rebuilt sales summary for {days} days in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,207 @@
+import argparse
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from db import get_product_by_name, place_order_batch
+from delivery import get_zone_index
+from notify import start_outbox_worker, wake_outbox
+from perf import count, timer
+
+# ---------------- BATCH ORDER API ----------------
+# A small JSON endpoint for B2B/reseller orders, using the same db.py order
+# path as the Streamlit app. One request is one batch: every line is
+# placed in a single transaction, or none are.
+#
+#   POST /orders/batch
+#   X-API-Key: <PHENYL_API_KEY>            (required when that is set)
+#   {
+#     "idempotency_key": "PO-2026-0042",   (or an Idempotency-Key header)
+#     "customer": {"name": "...", "phone": "...", "address": "...", "pincode": "600116"},
+#     "payment_method": "Cash On Delivery",
+#     "lines": [{"product": "Pine Phenyl", "quantity": 40}, {"product_id": 3, "quantity": 25}]
+#   }
+#
+# 200 accepted (Idempotent-Replayed: true when answered from a retry),
+# 409 rejected (per-line errors) or key reused for a different body,
+# 400 invalid request, 401 bad API key, 500 server error (safe to retry
+# with the same idempotency key).
+#
+#   python api.py --port 8600
+# or set PHENYL_API_PORT and app.py starts it alongside the shop.
+
+log = logging.getLogger("phenyl_shop.api")
+
+API_KEY = os.environ.get("PHENYL_API_KEY")
+API_PORT = os.environ.get("PHENYL_API_PORT")
+MAX_LINES = 500
+MAX_QUANTITY = 100000  # litres per line
+MAX_ID = 2 ** 63 - 1  # largest SQLite INTEGER
+MAX_BODY = 1024 * 1024
+PAYMENT_METHODS = ["Cash On Delivery", "UPI Payment", "Bank Transfer"]
+UPI_ID = "divakardiva1011@oksbi"
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _text(data, field, required=True):
+    value = data.get(field)
+    if value is None or str(value).strip() == "":
+        if required:
+            raise BadRequest(f"{field} is required")
+        return ""
+    return str(value).strip()
+
+
+def parse_batch(body, header_key=None):
+    # Returns (idempotency_key, customer, payment_method, lines, delivery_charge)
+    if not isinstance(body, dict):
+        raise BadRequest("request body must be a JSON object")
+    key = header_key or body.get("idempotency_key")
+    if not key or not isinstance(key, str) or len(key) > 200:
+        raise BadRequest("idempotency_key is required (max 200 characters)")
+
+    customer = body.get("customer")
+    if not isinstance(customer, dict):
+        raise BadRequest("customer is required")
+    customer = {field: _text(customer, field) for field in ("name", "phone", "address", "pincode")}
+
+    delivery_charge = 0
+    zone_index = get_zone_index()
+    if zone_index is not None:
+        zone = zone_index.lookup(customer["pincode"])
+        if zone is None:
+            raise BadRequest("pincode is outside the delivery area")
+        delivery_charge = zone.charge
+
+    payment_method = _text(body, "payment_method", required=False) or "Cash On Delivery"
+    if payment_method not in PAYMENT_METHODS:
+        raise BadRequest(f"payment_method must be one of {PAYMENT_METHODS}")
+
+    raw_lines = body.get("lines")
+    if not isinstance(raw_lines, list) or not raw_lines:
+        raise BadRequest("lines must be a non-empty list")
+    if len(raw_lines) > MAX_LINES:
+        raise BadRequest(f"at most {MAX_LINES} lines per batch")
+
+    lines = []
+    for i, line in enumerate(raw_lines):
+        if not isinstance(line, dict):
+            raise BadRequest(f"line {i}: must be an object")
+        quantity = line.get("quantity")
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or not 1 <= quantity <= MAX_QUANTITY:
+            raise BadRequest(f"line {i}: quantity must be an integer from 1 to {MAX_QUANTITY}")
+        product_id = line.get("product_id")
+        if product_id is None and line.get("product"):
+            product = get_product_by_name(str(line["product"]))
+            if product is None:
+                raise BadRequest(f"line {i}: unknown product {line['product']!r}")
+            product_id = product[0]
+        if not isinstance(product_id, int) or isinstance(product_id, bool):
+            raise BadRequest(f"line {i}: product_id or product is required")
+        if not 1 <= product_id <= MAX_ID:
+            raise BadRequest(f"line {i}: unknown product_id {product_id}")
+        lines.append((product_id, quantity))
+    return key, customer, payment_method, lines, delivery_charge
+
+
+def request_hash(customer, payment_method, lines):
+    canonical = json.dumps([customer, payment_method, lines], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def submit_batch(body, header_key=None):
+    # Returns (http_status, result, replayed)
+    key, customer, payment_method, lines, delivery_charge = parse_batch(body, header_key)
+    result, replayed = place_order_batch(
+        key, request_hash(customer, payment_method, lines),
+        customer["name"], customer["phone"], customer["address"], customer["pincode"],
+        payment_method, UPI_ID if payment_method == "UPI Payment" else "", lines, delivery_charge)
+    if result["status"] == "accepted":
+        if not replayed:
+            wake_outbox()
+        return 200, result, replayed
+    return 409, result, replayed
+
+
+# ---------------- HTTP SERVER ----------------
+class BatchOrderHandler(BaseHTTPRequestHandler):
+
+    def _reply(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, {"status": "ok"})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/orders/batch":
+            self._reply(404, {"error": "not found"})
+            return
+        if API_KEY and not hmac.compare_digest(self.headers.get("X-API-Key", ""), API_KEY):
+            self._reply(401, {"error": "invalid API key"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_BODY:
+            self._reply(400, {"error": "request body is missing or too large"})
+            return
+        count("api.batches")
+        try:
+            body = json.loads(self.rfile.read(length))
+            with timer("api.batch"):
+                status, result, replayed = submit_batch(body, self.headers.get("Idempotency-Key"))
+        except (BadRequest, ValueError) as e:
+            self._reply(400, {"error": str(e)})
+            return
+        except Exception as e:
+            # Writer timeouts, database errors: answer in JSON rather than
+            # dropping the connection with the handler thread
+            log.exception("batch order failed")
+            count("api.errors")
+            self._reply(500, {"error": str(e) if isinstance(e, RuntimeError) else "internal error"})
+            return
+        self._reply(status, result, {"Idempotent-Replayed": "true" if replayed else "false"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_api_server(port=None, host="127.0.0.1"):
+    # Serves on a daemon thread; call once per process
+    port = int(port or API_PORT)
+    server = ThreadingHTTPServer((host, port), BatchOrderHandler)
+    threading.Thread(target=server.serve_forever, name="batch-order-api", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch order intake API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(API_PORT or 8600))
+    args = parser.parse_args(argv)
+
+    start_outbox_worker()
+    server = ThreadingHTTPServer((args.host, args.port), BatchOrderHandler)
+    print(f"Batch order API on http://{args.host}:{args.port}/orders/batch")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,70 @@
 import streamlit as st
-import sqlite3
-import pandas as pd
-import base64
-import qrcode
-from io import BytesIO
-from streamlit_autorefresh import st_autorefresh
+import os
 import urllib.parse
+import datetime
+import time
+from collections import deque
+from db import (add_product, delete_product, get_products, search_products, place_order, query_orders, count_orders, get_orders_after,
+                record_stock_movement, get_stock_movements, MOVEMENT_KINDS)
+from analytics import rebuild_sales_summary, get_sales_totals, get_daily_sales, get_product_sales, get_payment_sales
+from qr import generate_qr, qr_cache_info
+from perf import timer, record, count, snapshot, counters, prometheus_text, start_metrics_server, METRICS_PORT
+from notify import start_outbox_worker, wake_outbox, outbox_counts
+from delivery import get_zone_index
+from export import EXPORT_FORMATS, export_download
+from invoices import (FORMATS as INVOICE_FORMATS, get_invoice_order, render_invoice, invoice_filename, amount_due,
+                      render_day_file, read_day_file, remove_day_file)
+from api import start_api_server, API_PORT
+from archive import (ARCHIVE_AFTER_DAYS, ARCHIVE_INTERVAL_HOURS, archive_stats, database_bytes,
+                     run_archive, start_archive_scheduler, query_order_history, count_order_history)
+from assets import SLIDER_IMAGES, build_slider_assets, slider_image_url, slider_image_data_uri
 
 # ---------------- PAGE CONFIG ----------------
 st.set_page_config(page_title="TAMILAN CHEMICALS", page_icon="🧴", layout="wide")
+rerun_start = time.perf_counter()
+
+# ---------------- METRICS ----------------
+# Timings are collected in perf.py; set PHENYL_METRICS_PORT to also serve
+# them at http://127.0.0.1:<port>/metrics for a local Prometheus scraper
+@st.cache_resource
+def start_metrics():
+    if METRICS_PORT:
+        return start_metrics_server()
+
+start_metrics()
+
+# ---------------- NOTIFICATIONS ----------------
+# Order notifications are queued with the order and sent by background
+# workers (notify.py), started once per process
+@st.cache_resource
+def start_notifications():
+    return start_outbox_worker()
+
+start_notifications()
+
+# ---------------- BATCH ORDER API ----------------
+# Set PHENYL_API_PORT to accept reseller batch orders over HTTP (api.py)
+# alongside the shop, on http://127.0.0.1:<port>/orders/batch
+@st.cache_resource
+def start_batch_api():
+    if API_PORT:
+        return start_api_server()
+
+start_batch_api()
+
+# ---------------- ORDER ARCHIVE ----------------
+# Set PHENYL_ARCHIVE_INTERVAL_HOURS to move old orders into the monthly
+# archives and compact the database on a schedule (archive.py)
+@st.cache_resource
+def start_order_archive():
+    if ARCHIVE_INTERVAL_HOURS:
+        return start_archive_scheduler()
+
+start_order_archive()
 
 # ---------------- CSS DESIGN ----------------
-st.markdown("""
+with timer("page.css"):
+    st.markdown("""
 <style>
 .stApp {
     background: linear-gradient(135deg, #0a0f2c, #0b3d2e, #2b1055);
@@ -70,6 +123,17 @@ div[data-testid="stVerticalBlock"] > div {
     object-fit: cover;
 }
 
+/* Client-side rotation: slides are stacked and faded in turn by CSS */
+.slider-box.rotating img {
+    position: absolute;
+    top: 0;
+    left: 0;
+    opacity: 0;
+    animation-name: slider-fade;
+    animation-timing-function: ease-in-out;
+    animation-iteration-count: infinite;
+}
+
 /* Overlay Text */
 .overlay-text {
     position: absolute;
@@ -102,83 +166,124 @@ div[data-testid="stVerticalBlock"] > div {
 </style>
 """, unsafe_allow_html=True)
 
-# ---------------- AUTO REFRESH SLIDER ----------------
-st_autorefresh(interval=3000, key="slider")  # 3 seconds refresh
-
-# ---------------- DATABASE ----------------
-conn = sqlite3.connect("phenyl_shop.db", check_same_thread=False)
-cur = conn.cursor()
-
-# ---------------- CREATE TABLES ----------------
-cur.execute("""
-CREATE TABLE IF NOT EXISTS products(
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT,
-    price INTEGER,
-    stock INTEGER
-)
-""")
-
-cur.execute("""
-CREATE TABLE IF NOT EXISTS orders(
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    customer_name TEXT,
-    phone TEXT,
-    address TEXT,
-    pincode TEXT,
-    product TEXT,
-    quantity INTEGER,
-    total_price INTEGER,
-    payment_method TEXT,
-    upi_id TEXT
-)
-""")
-
-conn.commit()
-
-# ---------------- FUNCTIONS ----------------
-def add_product(name, price, stock):
-    cur.execute("INSERT INTO products(name, price, stock) VALUES(?,?,?)", (name, price, stock))
-    conn.commit()
-
-def delete_product(product_id):
-    cur.execute("DELETE FROM products WHERE id=?", (product_id,))
-    conn.commit()
-
-def get_products():
-    cur.execute("SELECT * FROM products")
-    return cur.fetchall()
-
-def place_order(customer_name, phone, address, pincode, product, quantity, total_price, payment_method, upi_id):
-    cur.execute("""
-        INSERT INTO orders(customer_name, phone, address, pincode, product, quantity, total_price, payment_method, upi_id)
-        VALUES(?,?,?,?,?,?,?,?,?)
-    """, (customer_name, phone, address, pincode, product, quantity, total_price, payment_method, upi_id))
-    conn.commit()
-
-def get_orders():
-    cur.execute("SELECT * FROM orders")
-    return cur.fetchall()
-
-def update_stock(product_name, quantity):
-    cur.execute("UPDATE products SET stock = stock - ? WHERE name = ?", (quantity, product_name))
-    conn.commit()
-
-def generate_qr(data):
-    qr = qrcode.make(data)
-    buf = BytesIO()
-    qr.save(buf, format="PNG")
-    return buf.getvalue()
-
-# ---------------- DEFAULT PRODUCTS ----------------
-cur.execute("SELECT COUNT(*) FROM products")
-count = cur.fetchone()[0]
-
-if count == 0:
-    add_product("Lemon Phenyl", 80, 50)
-    add_product("Pine Phenyl", 90, 40)
-    add_product("Rose Phenyl", 85, 30)
-    add_product("Lavender Phenyl", 100, 20)
+# ---------------- SLIDER ASSETS ----------------
+@st.cache_resource
+def load_slider_images():
+    return build_slider_assets(SLIDER_IMAGES)
+
+# ---------------- SLIDER ----------------
+# "client": browser rotates a preloaded list, no server reruns at all
+# "fragment": only the slider fragment reruns, and only while Home is open
+SLIDER_MODE = "client"
+SLIDER_INTERVAL = 3  # seconds per image
+
+def slider_src(img_file):
+    if st.get_option("server.enableStaticServing"):
+        return slider_image_url(img_file)
+    return slider_image_data_uri(img_file)
+
+def render_client_slider(images):
+    n = len(images)
+    show = 100 / n
+    fade = show * 0.15
+    slides = "".join(
+        f'<img src="{slider_src(img)}" style="animation-duration:{n * SLIDER_INTERVAL}s;'
+        f'animation-delay:{i * SLIDER_INTERVAL}s">'
+        for i, img in enumerate(images)
+    )
+    st.markdown(f"""
+    <style>
+    @keyframes slider-fade {{
+        0% {{ opacity: 0; }}
+        {fade:.2f}% {{ opacity: 1; }}
+        {show:.2f}% {{ opacity: 1; }}
+        {show + fade:.2f}% {{ opacity: 0; }}
+        100% {{ opacity: 0; }}
+    }}
+    </style>
+    <div class="slider-box rotating">
+        {slides}
+        <div class="overlay-text">
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+@st.fragment(run_every=SLIDER_INTERVAL)
+def render_fragment_slider(images):
+    if "img_index" not in st.session_state:
+        st.session_state.img_index = 0
+
+    img_file = images[st.session_state.img_index % len(images)]
+    st.session_state.img_index = (st.session_state.img_index + 1) % len(images)
+
+    st.markdown(f"""
+    <div class="slider-box">
+        <img src="{slider_src(img_file)}">
+        <div class="overlay-text">
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+# ---------------- TABLES ----------------
+# Rows go to st.dataframe as plain columns, so app.py itself never imports pandas
+def show_table(rows, columns):
+    with timer("page.dataframe"):
+        data = {col: [row[i] for row in rows] for i, col in enumerate(columns)}
+    st.dataframe(data, width="stretch")
+
+# ---------------- INCOMING ORDERS FEED ----------------
+# Remembers the highest order id already shown; each poll fetches only the
+# orders after it and appends them to a bounded buffer in session state,
+# so a poll costs the same however large the orders table is
+FEED_POLL_INTERVAL = 5  # seconds
+FEED_SIZE = 100  # orders kept on screen
+ORDER_TABLE_COLUMNS = ["ID", "Customer Name", "Phone", "Address", "Pincode",
+                       "Product", "Quantity", "Total Price", "Payment Method", "UPI ID", "Order Time", "Delivery"]
+
+def mark_feed_seen():
+    st.session_state.feed_unseen = 0
+
+@st.fragment(run_every=FEED_POLL_INTERVAL)
+def render_order_feed():
+    if "feed_orders" not in st.session_state:
+        recent = query_orders(page_size=FEED_SIZE)
+        st.session_state.feed_orders = deque(reversed(recent), maxlen=FEED_SIZE)
+        st.session_state.feed_last_id = recent[0][0] if recent else 0
+        st.session_state.feed_unseen = 0
+
+    feed = st.session_state.feed_orders
+    arrived = 0
+    while True:
+        new = get_orders_after(st.session_state.feed_last_id, FEED_SIZE)
+        if not new:
+            break
+        feed.extend(new)
+        st.session_state.feed_last_id = new[-1][0]
+        arrived += len(new)
+        if len(new) < FEED_SIZE:
+            break
+    if arrived:
+        st.session_state.feed_unseen += arrived
+        st.toast(f"🛎 {arrived} new order{'s' if arrived > 1 else ''}")
+
+    unseen = min(st.session_state.feed_unseen, len(feed))
+    c1, c2 = st.columns([3, 1])
+    with c1:
+        if unseen:
+            st.badge(f"{st.session_state.feed_unseen} new", icon="🛎", color="red")
+        else:
+            st.badge("No new orders", color="gray")
+    c2.button("Mark All Seen", disabled=not unseen, on_click=mark_feed_seen)
+
+    rows = list(reversed(feed))
+    show_table([("🆕" if i < unseen else "",) + row for i, row in enumerate(rows)], ["New"] + ORDER_TABLE_COLUMNS)
+    st.caption(f"Checked {datetime.datetime.now():%H:%M:%S} • refreshes every {FEED_POLL_INTERVAL}s • "
+               f"showing the latest {len(feed)} orders")
+
+# ---------------- UPI QR ----------------
+# QR codes are memoized per payment link in qr.py; "svg" renders a
+# resolution-independent vector code instead of a PNG
+QR_FORMAT = "png"
 
 # ---------------- TITLE CENTER ----------------
 st.markdown("""
@@ -199,40 +304,29 @@ st.markdown("<hr>", unsafe_allow_html=True)
 # ---------------- SIDEBAR MENU ----------------
 st.sidebar.markdown("## 📌 MENU")
 section = st.sidebar.radio("Select Page", ["🏠 Home", "🛒 Customer Order", "📞 Contact", "🔐 Admin Login"])
+page_key = section.split(" ", 1)[1].lower().replace(" ", "_")
+count(f"reruns.{page_key}")
 
 # ---------------- HOME PAGE ----------------
 if section == "🏠 Home":
 
-    # Add more than 10 images here
-    images = [
-        "img1.jpg", "img2.jpg", "img3.jpg", "img4.jpg", "img5.jpg",
-        "img6.jpg", "img7.jpg", "img8.jpg", "img9.jpg", "img10.jpg",
-        "img11.jpg", "img12.jpg"
-    ]
-
-    if "img_index" not in st.session_state:
-        st.session_state.img_index = 0
-
-    img_file = images[st.session_state.img_index]
-    st.session_state.img_index = (st.session_state.img_index + 1) % len(images)
+    # Resized variants are built once per process (see assets.py)
+    images = load_slider_images()
 
-    try:
-        img_base64 = base64.b64encode(open(img_file, "rb").read()).decode()
-        st.markdown(f"""
-        <div class="slider-box">
-            <img src="data:image/jpg;base64,{img_base64}">
-            <div class="overlay-text">
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-    except:
+    if images:
+        with timer("page.slider"):
+            if SLIDER_MODE == "client":
+                render_client_slider(images)
+            else:
+                render_fragment_slider(images)
+    else:
         st.warning("⚠️ Images not found! Add img1.jpg ... img12.jpg in same folder.")
 
     st.markdown("## 🛒 Available Products")
 
-    products = get_products()
-    df = pd.DataFrame(products, columns=["ID", "Product Name", "Price (₹)", "Stock (L)"])
-    st.dataframe(df, use_container_width=True)
+    # Only the top matches are fetched, however large the catalog is
+    search = st.text_input("🔍 Search Products", placeholder="e.g. lemon, floor cleaner, acid", key="home_search")
+    show_table(search_products(search), ["ID", "Product Name", "Price (₹)", "Stock (L)"])
 
 # ---------------- CUSTOMER ORDER PAGE ----------------
 elif section == "🛒 Customer Order":
@@ -244,29 +338,49 @@ elif section == "🛒 Customer Order":
     address = st.text_area("Delivery Address")
     pincode = st.text_input("Pincode")
 
-    products = get_products()
-    product_names = [p[1] for p in products]
+    search = st.text_input("🔍 Search Products", placeholder="e.g. lemon, floor cleaner, acid", key="order_search")
+    matches = {p[0]: p for p in search_products(search)}
+    if not matches:
+        st.warning("No products match your search")
+        st.stop()
 
-    selected_product = st.selectbox("Select Product", product_names)
+    selected_id = st.selectbox("Select Product", list(matches), format_func=lambda pid: matches[pid][1])
     quantity = st.number_input("Quantity (Liters)", min_value=1, max_value=100)
 
-    selected_data = [p for p in products if p[1] == selected_product][0]
+    selected_data = matches[selected_id]
+    selected_product = selected_data[1]
     price = selected_data[2]
     stock = selected_data[3]
 
     st.info(f"💰 Price per Liter: ₹{price}")
     st.warning(f"📦 Available Stock: {stock} Liters")
 
+    # ---------------- DELIVERY ZONE ----------------
+    # In-memory pincode index (delivery.py); no file or DB access per rerun
+    zone_index = get_zone_index()
+    zone = None
+    delivery_charge = 0
+    if zone_index is not None and pincode.strip() != "":
+        zone = zone_index.lookup(pincode.strip())
+        if zone is None:
+            st.error("🚫 Sorry, we do not deliver to this pincode yet")
+        else:
+            delivery_charge = zone.charge
+            charge_text = "Free delivery" if zone.charge == 0 else f"Delivery charge ₹{zone.charge}"
+            st.info(f"🚚 {zone.name}: {charge_text}, arrives in {zone.eta_days} day(s)")
+
+    # total_price is stored as product revenue; delivery is kept separately
     total_price = price * quantity
-    st.success(f"✅ Total Price: ₹{total_price}")
+    amount_payable = total_price + delivery_charge
+    st.success(f"✅ Total Price: ₹{amount_payable}")
 
     payment_method = st.selectbox("Payment Method", ["Cash On Delivery", "UPI Payment"])
     upi_id = "divakardiva1011@oksbi"
 
     # ---------------- UPI QR DISPLAY ----------------
     if payment_method == "UPI Payment":
-        upi_link = f"upi://pay?pa={upi_id}&pn=TAMILAN%20CHEMICALS&am={total_price}&cu=INR"
-        qr_img = generate_qr(upi_link)
+        upi_link = f"upi://pay?pa={upi_id}&pn=TAMILAN%20CHEMICALS&am={amount_payable}&cu=INR"
+        qr_img = generate_qr(upi_link, QR_FORMAT)
         st.image(qr_img, caption="📌 Scan & Pay using GPay / PhonePe / Paytm", width=250)
 
     # ---------------- WHATSAPP ORDER LINK ----------------
@@ -281,7 +395,7 @@ elif section == "🛒 Customer Order":
     Pincode: {pincode}
     Product: {selected_product}
     Quantity: {quantity} Liters
-    Total Price: ₹{total_price}
+    Total Price: ₹{amount_payable}
     Payment: {payment_method}
     """
 
@@ -292,13 +406,20 @@ elif section == "🛒 Customer Order":
     if st.button("✅ Confirm Order"):
         if name.strip() == "" or phone.strip() == "" or address.strip() == "" or pincode.strip() == "":
             st.error("❌ Please fill all details")
+        elif zone_index is not None and zone is None:
+            st.error("❌ This pincode is outside our delivery area")
         elif quantity > stock:
             st.error("❌ Stock not available for this quantity!")
         else:
-            place_order(name, phone, address, pincode, selected_product, quantity, total_price, payment_method, upi_id)
-            update_stock(selected_product, quantity)
-            st.success("🎉 Order placed successfully!")
-            st.balloons()
+            # Stock is re-checked inside the order transaction
+            order_id = place_order(name, phone, address, pincode, selected_data[0], quantity, total_price, payment_method, upi_id,
+                                   delivery_charge)
+            if order_id is None:
+                st.error("❌ Stock not available for this quantity!")
+            else:
+                wake_outbox()
+                st.success("🎉 Order placed successfully!")
+                st.balloons()
 
 # ---------------- CONTACT PAGE ----------------
 elif section == "📞 Contact":
@@ -338,13 +459,14 @@ elif section == "🔐 Admin Login":
 
         st.success("🎉 Welcome Admin!")
 
-        admin_menu = st.radio("Admin Options", ["Add Product", "Delete Product", "View Products", "View Orders"])
+        admin_menu = st.radio("Admin Options", ["Add Product", "Delete Product", "View Products", "Inventory", "Reorder Suggestions", "Incoming Orders", "View Orders", "Export Orders", "Invoices", "Order Archive", "Sales Dashboard", "Performance"])
 
         # Add Product
         if admin_menu == "Add Product":
             st.subheader("➕ Add New Product")
 
             pname = st.text_input("Product Name")
+            pdesc = st.text_area("Description (used by product search)")
             pprice = st.number_input("Price (₹)", min_value=1)
             pstock = st.number_input("Stock (Liters)", min_value=1)
 
@@ -352,16 +474,17 @@ elif section == "🔐 Admin Login":
                 if pname.strip() == "":
                     st.error("❌ Product Name must be filled!")
                 else:
-                    add_product(pname, pprice, pstock)
-                    st.success("✅ Product Added Successfully!")
+                    if add_product(pname, pprice, pstock, pdesc.strip() or None) is None:
+                        st.error("❌ A product with this name already exists!")
+                    else:
+                        st.success("✅ Product Added Successfully!")
 
         # Delete Product
         elif admin_menu == "Delete Product":
             st.subheader("🗑 Delete Product")
 
             products = get_products()
-            df = pd.DataFrame(products, columns=["ID", "Product Name", "Price (₹)", "Stock (L)"])
-            st.dataframe(df, use_container_width=True)
+            show_table(products, ["ID", "Product Name", "Price (₹)", "Stock (L)"])
 
             pid = st.number_input("Enter Product ID to Delete", min_value=1)
 
@@ -373,17 +496,300 @@ elif section == "🔐 Admin Login":
         elif admin_menu == "View Products":
             st.subheader("📋 Product List")
             products = get_products()
-            df = pd.DataFrame(products, columns=["ID", "Product Name", "Price (₹)", "Stock (L)"])
-            st.dataframe(df, use_container_width=True)
+            show_table(products, ["ID", "Product Name", "Price (₹)", "Stock (L)"])
+
+        # Inventory
+        elif admin_menu == "Inventory":
+            st.subheader("📦 Inventory")
+            products = get_products()
+            show_table(products, ["ID", "Product Name", "Price (₹)", "Stock (L)"])
+
+            st.markdown("#### Stock Entry")
+            product_ids = {p[1]: p[0] for p in products}
+            c1, c2 = st.columns(2)
+            entry_product = c1.selectbox("Product", list(product_ids), key="stock_product")
+            entry_kind = c2.radio("Entry Type", ["Restock", "Return", "Adjustment"], horizontal=True)
+            if entry_kind == "Adjustment":
+                entry_quantity = st.number_input("Change (Liters, negative to remove)", value=0, step=1)
+            else:
+                entry_quantity = st.number_input("Quantity (Liters)", min_value=1, step=1)
+            entry_note = st.text_input("Note (supplier, invoice, reason...)")
+
+            if st.button("Record Stock Entry"):
+                if entry_product is None or entry_quantity == 0:
+                    st.error("❌ Choose a product and a non-zero quantity!")
+                elif record_stock_movement(product_ids[entry_product], entry_kind.lower(), int(entry_quantity),
+                                           entry_note.strip() or None) is None:
+                    st.error("❌ Stock cannot go below zero!")
+                else:
+                    st.success(f"✅ {entry_kind} of {int(entry_quantity)} L recorded for {entry_product}")
+
+            st.markdown("#### Stock Movement History")
+            c3, c4 = st.columns(2)
+            history_products = {"All Products": None}
+            history_products.update(product_ids)
+            history_product = c3.selectbox("Product", list(history_products), key="history_product")
+            history_kind = c4.selectbox("Movement", ["All"] + MOVEMENT_KINDS)
+
+            # Same before_id cursor stack as View Orders
+            history_key = (history_product, history_kind)
+            if st.session_state.get("movements_filter_key") != history_key:
+                st.session_state.movements_filter_key = history_key
+                st.session_state.movements_cursors = [None]
+            cursors = st.session_state.movements_cursors
+            movements = get_stock_movements(product_id=history_products[history_product],
+                                            kind=None if history_kind == "All" else history_kind,
+                                            before_id=cursors[-1], limit=50)
+            show_table(movements, ["ID", "Time", "Product", "Movement", "Change (L)", "Order ID", "Note"])
+
+            prev_col, next_col = st.columns(2)
+            if prev_col.button("⬅ Newer", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+            if next_col.button("Older ➡", disabled=len(movements) < 50):
+                cursors.append(movements[-1][0])
+                st.rerun()
+
+        # Reorder Suggestions
+        elif admin_menu == "Reorder Suggestions":
+            st.subheader("🚚 Reorder Suggestions")
+            # forecast.py needs numpy; imported here so other pages never load it
+            from forecast import reorder_suggestions, rolling_demand, LEAD_TIME_DAYS, REVIEW_DAYS, HISTORY_DAYS
+            st.caption(f"Forecast from the last {HISTORY_DAYS} days of sales; reorder points cover a "
+                       f"{LEAD_TIME_DAYS}-day supplier lead time plus safety stock, suggested orders "
+                       f"cover {REVIEW_DAYS} more days")
+
+            suggestions = reorder_suggestions()
+            urgent = [s for s in suggestions if s[8] in ("Out of stock", "Reorder now")]
+            m1, m2, m3 = st.columns(3)
+            m1.metric("Out of Stock", sum(1 for s in suggestions if s[8] == "Out of stock"))
+            m2.metric("Reorder Now", sum(1 for s in suggestions if s[8] == "Reorder now"))
+            m3.metric("Litres to Order", sum(s[7] for s in urgent))
+
+            show_only_urgent = st.checkbox("Only products to reorder now", value=bool(urgent))
+            show_table(urgent if show_only_urgent else suggestions,
+                       ["ID", "Product", "Stock (L)", "Last 7 Days (L/day)", "Forecast (L/day)", "Days of Cover",
+                        "Reorder Point (L)", "Suggested Order (L)", "Status"])
+
+            if suggestions:
+                st.markdown("#### Daily Demand (7-day average)")
+                chart_products = {s[1]: s[0] for s in suggestions}
+                chart_product = st.selectbox("Product", list(chart_products), key="reorder_chart_product")
+                demand = rolling_demand(chart_products[chart_product])
+                if demand:
+                    st.line_chart({"Day": [d[0] for d in demand], "Litres per Day": [d[1] for d in demand]},
+                                  x="Day", y="Litres per Day")
+
+        # Incoming Orders
+        elif admin_menu == "Incoming Orders":
+            st.subheader("🛎 Incoming Orders")
+            render_order_feed()
 
         # View Orders
         elif admin_menu == "View Orders":
             st.subheader("📦 Customer Orders List")
 
-            orders = get_orders()
-            df = pd.DataFrame(
-                orders,
-                columns=["ID", "Customer Name", "Phone", "Address", "Pincode",
-                         "Product", "Quantity", "Total Price", "Payment Method", "UPI ID"]
+            # Filters run in SQL; only the current page is fetched
+            c1, c2, c3 = st.columns(3)
+            date_range = c1.date_input("Order Date", value=())
+            product_options = {"All Products": None}
+            product_options.update({p[1]: p[0] for p in get_products()})
+            product_filter = c2.selectbox("Product", list(product_options))
+            payment_filter = c3.selectbox("Payment", ["All", "Cash On Delivery", "UPI Payment"])
+
+            c4, c5 = st.columns([3, 1])
+            search = c4.text_input("Search Phone / Pincode")
+            page_size = c5.selectbox("Rows per page", [25, 50, 100], index=1)
+            # Archived months are only attached when asked for
+            include_archive = st.checkbox("Include archived orders")
+
+            filters = {
+                "date_from": date_range[0] if len(date_range) > 0 else None,
+                "date_to": date_range[-1] if len(date_range) > 0 else None,
+                "product_id": product_options[product_filter],
+                "payment_method": None if payment_filter == "All" else payment_filter,
+                "search": search,
+            }
+
+            # Stack of before_id cursors, one per page visited; reset on new filters
+            filter_key = (tuple(filters.items()), page_size, include_archive)
+            if st.session_state.get("orders_filter_key") != filter_key:
+                st.session_state.orders_filter_key = filter_key
+                st.session_state.orders_cursors = [None]
+
+            cursors = st.session_state.orders_cursors
+            if include_archive:
+                orders = query_order_history(before_id=cursors[-1], page_size=page_size, **filters)
+                total = count_order_history(**filters)
+            else:
+                orders = query_orders(before_id=cursors[-1], page_size=page_size, **filters)
+                total = count_orders(**filters)
+
+            show_table(orders, ORDER_TABLE_COLUMNS)
+
+            page = len(cursors)
+            pages = max(1, -(-total // page_size))
+            st.caption(f"Page {page} of {pages} • {total} orders")
+
+            prev_col, next_col = st.columns(2)
+            if prev_col.button("⬅ Previous", disabled=page == 1):
+                cursors.pop()
+                st.rerun()
+            if next_col.button("Next ➡", disabled=len(orders) < page_size or page >= pages):
+                cursors.append(orders[-1][0])
+                st.rerun()
+
+        # Export Orders
+        elif admin_menu == "Export Orders":
+            st.subheader("📤 Export Orders")
+
+            c1, c2, c3 = st.columns(3)
+            date_range = c1.date_input("Order Date", value=(), key="export_dates")
+            product_options = {"All Products": None}
+            product_options.update({p[1]: p[0] for p in get_products()})
+            product_filter = c2.selectbox("Product", list(product_options), key="export_product")
+            export_format = c3.selectbox("Format", list(EXPORT_FORMATS))
+
+            filters = {
+                "date_from": date_range[0] if len(date_range) > 0 else None,
+                "date_to": date_range[-1] if len(date_range) > 0 else None,
+                "product_id": product_options[product_filter],
+            }
+            include_archive = st.checkbox("Include archived orders", value=True, key="export_archive")
+            total = count_order_history(**filters) if include_archive else count_orders(**filters)
+            st.caption(f"{total} orders match")
+
+            # The file is only generated when the button is clicked, in chunks
+            st.download_button(
+                "⬇ Download Orders",
+                data=lambda: export_download(export_format, include_archive=include_archive, **filters),
+                file_name=f"orders.{export_format}",
+                mime=EXPORT_FORMATS[export_format][1],
             )
-            st.dataframe(df, use_container_width=True)
+
+        # Invoices
+        elif admin_menu == "Invoices":
+            st.subheader("🧾 Invoices")
+
+            st.markdown("#### Single Order")
+            c1, c2 = st.columns(2)
+            invoice_id = c1.number_input("Order ID", min_value=1, step=1)
+            invoice_format = c2.selectbox("Format", list(INVOICE_FORMATS), key="invoice_format")
+            invoice_order = get_invoice_order(int(invoice_id))
+            if invoice_order is None:
+                st.info("No order with this ID")
+            else:
+                st.caption(f"{invoice_order[1]} • {invoice_order[5]} × {invoice_order[6]} L • ₹{amount_due(invoice_order)}")
+                st.download_button(
+                    "⬇ Download Invoice",
+                    data=lambda: render_invoice(invoice_order, invoice_format),
+                    file_name=invoice_filename(invoice_order, invoice_format),
+                    mime=INVOICE_FORMATS[invoice_format][1],
+                )
+
+            st.markdown("#### End of Day")
+            c3, c4 = st.columns(2)
+            invoice_day = c3.date_input("Day", value=datetime.date.today(), key="invoice_day")
+            day_format = c4.selectbox("Format", list(INVOICE_FORMATS), key="invoice_day_format")
+            # The zip stays in a temp file; session state holds only its path
+            if st.button("🧾 Render Day's Invoices"):
+                if "invoice_zip" in st.session_state:
+                    remove_day_file(st.session_state.pop("invoice_zip")[2])
+                with st.spinner("Rendering invoices..."):
+                    st.session_state.invoice_zip = (invoice_day, day_format) + render_day_file(invoice_day, day_format)
+
+            if "invoice_zip" in st.session_state and not os.path.exists(st.session_state.invoice_zip[2]):
+                del st.session_state.invoice_zip
+            if "invoice_zip" in st.session_state:
+                zip_day, zip_format, zip_path, stats = st.session_state.invoice_zip
+                m1, m2, m3 = st.columns(3)
+                m1.metric("Invoices", stats["invoices"])
+                m2.metric("Invoices / s", stats["invoices_per_second"] or 0)
+                m3.metric("Workers", stats["workers"])
+                st.download_button(
+                    f"⬇ Download {zip_day} Invoices (.zip)",
+                    data=lambda: read_day_file(zip_path),
+                    file_name=f"invoices-{zip_day}-{zip_format}.zip",
+                    mime="application/zip",
+                )
+
+        # Order Archive
+        elif admin_menu == "Order Archive":
+            st.subheader("🗄 Order Archive")
+            st.caption("Old orders move to one archive file per month; View Orders and Export can still include them")
+
+            m1, m2 = st.columns(2)
+            m1.metric("Orders in Live Database", count_orders())
+            m2.metric("Live Database Size", f"{database_bytes() / 1024:.0f} KB")
+
+            stats = archive_stats()
+            show_table([(month, orders, round(size / 1024, 1)) for month, orders, size in stats],
+                       ["Month", "Orders", "Size (KB)"])
+
+            older_than = st.number_input("Archive orders older than (days)", min_value=1, value=ARCHIVE_AFTER_DAYS)
+            if st.button("🗄 Archive & Compact Now"):
+                with st.spinner("Archiving..."):
+                    result = run_archive(older_than)
+                moved = sum(result["moved"].values())
+                if moved:
+                    st.success(f"✅ Archived {moved} orders; database {result['bytes_before'] / 1024:.0f} KB → "
+                               f"{result['bytes_after'] / 1024:.0f} KB")
+                else:
+                    st.info("No orders old enough to archive")
+
+        # Sales Dashboard
+        elif admin_menu == "Sales Dashboard":
+            st.subheader("📈 Sales Dashboard")
+
+            # Reads only the daily summary tables, never the orders table
+            today = datetime.date.today()
+            date_range = st.date_input("Period", value=(today - datetime.timedelta(days=29), today))
+            date_from = date_range[0]
+            date_to = date_range[-1]
+
+            order_count, litres, revenue = get_sales_totals(date_from, date_to)
+            m1, m2, m3 = st.columns(3)
+            m1.metric("Revenue", f"₹{revenue}")
+            m2.metric("Orders", order_count)
+            m3.metric("Litres Sold", litres)
+
+            daily = get_daily_sales(date_from, date_to)
+            if daily:
+                st.markdown("#### Daily Revenue (₹)")
+                st.line_chart({"Day": [d[0] for d in daily], "Revenue": [d[3] for d in daily]}, x="Day", y="Revenue")
+
+            st.markdown("#### Sales by Product")
+            show_table(get_product_sales(date_from, date_to), ["Product", "Orders", "Litres", "Revenue (₹)"])
+
+            st.markdown("#### Orders by Payment Method")
+            show_table(get_payment_sales(date_from, date_to), ["Payment Method", "Orders", "Revenue (₹)"])
+
+            # Backfill, e.g. after upgrading a database that already had orders
+            if st.button("🔄 Rebuild Summary From Orders"):
+                days = rebuild_sales_summary()
+                st.success(f"✅ Rebuilt sales summary for {days} days")
+
+        # Performance
+        elif admin_menu == "Performance":
+            st.subheader("⏱ Performance")
+            st.caption("Rolling percentiles over the last samples of each timer in this server process")
+
+            rows = [(name, n, p50 * 1000, p95 * 1000, p99 * 1000, total)
+                    for name, n, p50, p95, p99, total, _ in snapshot()]
+            show_table(rows, ["Timer", "Samples", "p50 (ms)", "p95 (ms)", "p99 (ms)", "Total Calls"])
+
+            st.markdown("#### Counters")
+            st.caption("Reruns per page, QR cache hits and misses, notifications, API batches")
+            show_table(counters(), ["Counter", "Count"])
+            qr_cache = qr_cache_info()
+            st.caption(f"UPI QR cache: {qr_cache.currsize} of {qr_cache.maxsize} codes cached")
+
+            st.markdown("#### Notification Outbox")
+            show_table(outbox_counts(), ["Status", "Notifications"])
+
+            with st.expander("Prometheus metrics"):
+                st.code(prometheus_text(), language="text")
+
+# ---------------- RERUN TIMING ----------------
+# Reruns cut short by st.rerun() or an exception are not recorded
+record(f"page.{page_key}", time.perf_counter() - rerun_start)
@@ -0,0 +1,246 @@
+import argparse
+import datetime
+import glob
+import logging
+import os
+import re
+import threading
+import time
+from db import DB_PATH, ORDER_COLUMNS, get_pool, fetchall, order_filters, query_orders, count_orders
+from perf import count, timed
+
+# ---------------- ORDER ARCHIVE ----------------
+# Orders older than ARCHIVE_AFTER_DAYS move out of the hot orders table into
+# one SQLite file per month (archive/orders_2026-01.db), so the hot table,
+# its indexes, backups and VACUUM only grow with recent orders. History
+# queries ATTACH the archives one at a time, and only the months a date
+# filter can reach. Orders without a timestamp stay in the hot table.
+# The sales_* summaries are left alone; they keep covering archived orders.
+#
+#   python archive.py run --older-than-days 180
+#   python archive.py list
+
+log = logging.getLogger("phenyl_shop.archive")
+
+ARCHIVE_DIR = os.environ.get("PHENYL_ARCHIVE_DIR",
+                             os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "archive"))
+ARCHIVE_AFTER_DAYS = int(os.environ.get("PHENYL_ARCHIVE_AFTER_DAYS", 180))
+ARCHIVE_INTERVAL_HOURS = os.environ.get("PHENYL_ARCHIVE_INTERVAL_HOURS")  # unset = no scheduled runs
+ARCHIVE_ALIAS = "cold"
+
+ARCHIVED_COLUMNS = ("id, customer_name, phone, address, pincode, product_id, product, "
+                    "quantity, total_price, payment_method, upi_id, created_at, delivery_charge")
+
+_ARCHIVE_FILE = re.compile(r"orders_(\d{4}-\d{2})\.db$")
+_run_lock = threading.Lock()
+
+
+def archive_path(month):
+    return os.path.join(ARCHIVE_DIR, f"orders_{month}.db")
+
+
+def list_archives(date_from=None, date_to=None):
+    # [(month, path)], newest first. Months outside the date filter are
+    # skipped, so they are never attached.
+    archives = []
+    for path in glob.glob(os.path.join(ARCHIVE_DIR, "orders_*.db")):
+        match = _ARCHIVE_FILE.search(path)
+        if match is None:
+            continue
+        month = match.group(1)
+        if date_from is not None and month < date_from.isoformat()[:7]:
+            continue
+        if date_to is not None and month > date_to.isoformat()[:7]:
+            continue
+        archives.append((month, path))
+    return sorted(archives, reverse=True)
+
+
+def fetch_archive(path, sql, params=()):
+    # Runs sql on a pooled reader with the archive attached as cold.*
+    with get_pool().read(attach=(path, ARCHIVE_ALIAS)) as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, params)
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+
+# ---------------- ARCHIVING ----------------
+def _create_archive_schema(conn):
+    # Same columns as orders, without the foreign key: archived orders
+    # outlive the products they were placed for
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ARCHIVE_ALIAS}.orders(
+            id INTEGER PRIMARY KEY,
+            customer_name TEXT,
+            phone TEXT,
+            address TEXT,
+            pincode TEXT,
+            product_id INTEGER,
+            product TEXT,
+            quantity INTEGER,
+            total_price INTEGER,
+            payment_method TEXT,
+            upi_id TEXT,
+            created_at TEXT,
+            delivery_charge INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    # Archives written before orders had a delivery_charge column
+    columns = [row[1] for row in conn.execute(f"PRAGMA {ARCHIVE_ALIAS}.table_info(orders)")]
+    if "delivery_charge" not in columns:
+        conn.execute(f"ALTER TABLE {ARCHIVE_ALIAS}.orders ADD COLUMN delivery_charge INTEGER NOT NULL DEFAULT 0")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {ARCHIVE_ALIAS}.idx_orders_created_at ON orders(created_at)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {ARCHIVE_ALIAS}.idx_orders_phone ON orders(phone)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {ARCHIVE_ALIAS}.idx_orders_pincode ON orders(pincode)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {ARCHIVE_ALIAS}.idx_orders_product_id ON orders(product_id)")
+
+
+def _month_range(month):
+    start = datetime.date.fromisoformat(month + "-01")
+    end = (start + datetime.timedelta(days=32)).replace(day=1)
+    return start.isoformat(), end.isoformat()
+
+
+def archive_month(month, cutoff):
+    # Copies then deletes, in two transactions: a commit is not atomic
+    # across two files, and this order can only leave a copy behind, which
+    # the next run skips (INSERT OR IGNORE) before deleting it from hot.
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    start, end = _month_range(month)
+    where = "created_at >= ? AND created_at < ? AND created_at < ?"
+    params = (start, end, cutoff)
+    attach = (archive_path(month), ARCHIVE_ALIAS)
+
+    pool = get_pool()
+    with pool.write(attach=attach) as conn:
+        _create_archive_schema(conn)
+        conn.execute(f"""
+            INSERT OR IGNORE INTO {ARCHIVE_ALIAS}.orders({ARCHIVED_COLUMNS})
+            SELECT {ARCHIVED_COLUMNS} FROM main.orders WHERE {where}
+        """, params)
+    with pool.write(attach=attach) as conn:
+        cur = conn.execute(f"""
+            DELETE FROM main.orders
+            WHERE {where} AND id IN (SELECT id FROM {ARCHIVE_ALIAS}.orders)
+        """, params)
+        return cur.rowcount
+
+
+@timed("archive.run")
+def run_archive(older_than_days=ARCHIVE_AFTER_DAYS, vacuum=True):
+    # Moves every order placed before today - older_than_days, month by
+    # month, then VACUUMs the hot database if anything moved.
+    # Returns {"moved": {month: orders}, "vacuumed": bool, "bytes_before", "bytes_after"}.
+    with _run_lock:
+        cutoff = (datetime.date.today() - datetime.timedelta(days=older_than_days)).isoformat()
+        months = [row[0] for row in fetchall(
+            "SELECT DISTINCT substr(created_at, 1, 7) FROM orders WHERE created_at < ? ORDER BY 1", (cutoff,))]
+        bytes_before = database_bytes()
+        moved = {}
+        for month in months:
+            moved[month] = archive_month(month, cutoff)
+        total = sum(moved.values())
+        count("archive.orders_moved", total)
+        vacuumed = vacuum and total > 0
+        if vacuumed:
+            get_pool().vacuum()
+        return {"moved": moved, "vacuumed": vacuumed,
+                "bytes_before": bytes_before, "bytes_after": database_bytes()}
+
+
+def database_bytes():
+    # Hot database plus its WAL
+    return sum(os.path.getsize(p) for p in (DB_PATH, DB_PATH + "-wal") if os.path.exists(p))
+
+
+def archive_stats():
+    # [(month, orders, bytes)], newest first
+    return [(month, fetch_archive(path, f"SELECT COUNT(*) FROM {ARCHIVE_ALIAS}.orders")[0][0], os.path.getsize(path))
+            for month, path in list_archives()]
+
+
+# ---------------- HISTORY QUERIES ----------------
+# Same filters and keyset paging as db.query_orders / db.count_orders,
+# over the hot table and the archives together.
+
+@timed("archive.query_order_history")
+def query_order_history(before_id=None, page_size=50, **filters):
+    rows = query_orders(before_id=before_id, page_size=page_size, **filters)
+    where, params = order_filters(**filters)
+    if before_id is not None:
+        where += (" AND " if where else " WHERE ") + "id < ?"
+        params.append(before_id)
+
+    for month, path in list_archives(filters.get("date_from"), filters.get("date_to")):
+        # Archives are newest first and ids grow with time: once the page is
+        # full of ids above everything in an archive, older ones can't matter
+        floor = rows[page_size - 1][0] if len(rows) >= page_size else None
+        with get_pool().read(attach=(path, ARCHIVE_ALIAS)) as conn:
+            top = conn.execute(f"SELECT MAX(id) FROM {ARCHIVE_ALIAS}.orders").fetchall()[0][0]
+            if top is None:
+                continue
+            if floor is not None and top < floor:
+                break
+            rows += conn.execute(f"SELECT {ORDER_COLUMNS} FROM {ARCHIVE_ALIAS}.orders{where} ORDER BY id DESC LIMIT ?",
+                                 params + [page_size]).fetchall()
+        rows = sorted(rows, key=lambda row: row[0], reverse=True)[:page_size]
+    return rows
+
+
+@timed("archive.count_order_history")
+def count_order_history(**filters):
+    where, params = order_filters(**filters)
+    total = count_orders(**filters)
+    for _, path in list_archives(filters.get("date_from"), filters.get("date_to")):
+        total += fetch_archive(path, f"SELECT COUNT(*) FROM {ARCHIVE_ALIAS}.orders{where}", params)[0][0]
+    return total
+
+
+# ---------------- SCHEDULED RUNS ----------------
+def start_archive_scheduler(interval_hours=None, older_than_days=ARCHIVE_AFTER_DAYS):
+    # Archives and compacts every interval on a daemon thread; call once per process
+    interval = float(interval_hours or ARCHIVE_INTERVAL_HOURS) * 3600
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                result = run_archive(older_than_days)
+                log.info("archived %s orders", sum(result["moved"].values()))
+            except Exception:
+                log.exception("order archive run failed")
+
+    thread = threading.Thread(target=loop, name="order-archive", daemon=True)
+    thread.start()
+    return thread
+
+
+# ---------------- COMMAND LINE ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move old orders into monthly archive databases")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="archive old orders, then VACUUM the hot database")
+    run.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    run.add_argument("--no-vacuum", action="store_true")
+    sub.add_parser("list", help="show archive files")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for month, orders, size in archive_stats():
+            print(f"{month}  {orders:>8} orders  {size / 1024:>10.1f} KB")
+        return
+
+    start = time.perf_counter()
+    result = run_archive(args.older_than_days, vacuum=not args.no_vacuum)
+    for month, moved in result["moved"].items():
+        print(f"{month}: {moved} orders archived")
+    print(f"Archived {sum(result['moved'].values())} orders in {time.perf_counter() - start:.2f}s; "
+          f"hot database {result['bytes_before'] / 1024:.0f} KB -> {result['bytes_after'] / 1024:.0f} KB"
+          + (" (vacuumed)" if result["vacuumed"] else ""))
+
+
+if __name__ == "__main__":
+    main()
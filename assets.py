@@ -0,0 +1,87 @@
+import os
+import base64
+from functools import lru_cache
+from io import BytesIO
+from perf import timed
+
+# ---------------- SLIDER ASSET PIPELINE ----------------
+# Full-size imgN.jpg files are resized once per process to the .slider-box
+# size and written under static/slider, which Streamlit serves as plain
+# URLs (server.enableStaticServing) so the browser can cache them.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, "static", "slider")
+STATIC_URL = "app/static/slider"
+
+SLIDER_IMAGES = [
+    "img1.jpg", "img2.jpg", "img3.jpg", "img4.jpg", "img5.jpg",
+    "img6.jpg", "img7.jpg", "img8.jpg", "img9.jpg", "img10.jpg",
+    "img11.jpg", "img12.jpg"
+]
+
+SLIDER_WIDTH = 1280
+SLIDER_HEIGHT = 380          # matches .slider-box height in app.py
+JPEG_QUALITY = 80
+CACHE_SIZE = 16              # max resized variants kept in memory
+
+
+def _variant_path(img_file):
+    return os.path.join(STATIC_DIR, img_file)
+
+
+def _source_path(img_file):
+    return os.path.join(BASE_DIR, img_file)
+
+
+@timed("image.resize")
+def render_variant(img_file):
+    # PIL is only needed when a variant has to be (re)built
+    from PIL import Image, ImageOps
+    with Image.open(_source_path(img_file)) as img:
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        img = ImageOps.fit(img, (SLIDER_WIDTH, SLIDER_HEIGHT), Image.LANCZOS)
+        buf = BytesIO()
+        img.save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+def build_slider_assets(images=SLIDER_IMAGES):
+    # Writes resized variants to static/slider, skipping ones that are
+    # already newer than their source. Returns the images that are available.
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    ready = []
+    for img_file in images:
+        src = _source_path(img_file)
+        dst = _variant_path(img_file)
+        if not os.path.exists(src):
+            continue
+        if not os.path.exists(dst) or os.path.getmtime(dst) < os.path.getmtime(src):
+            data = render_variant(img_file)
+            tmp = dst + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, dst)
+        ready.append(img_file)
+    return ready
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def slider_image_bytes(img_file):
+    path = _variant_path(img_file)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    return render_variant(img_file)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+@timed("image.encode")
+def slider_image_data_uri(img_file):
+    # Fallback when static serving is disabled: encoded once, not per rerun
+    return "data:image/jpeg;base64," + base64.b64encode(slider_image_bytes(img_file)).decode()
+
+
+def slider_image_url(img_file):
+    # mtime in the query string lets browsers cache until the variant changes
+    version = int(os.path.getmtime(_variant_path(img_file)))
+    return f"{STATIC_URL}/{img_file}?v={version}"
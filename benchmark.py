@@ -0,0 +1,262 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+# ---------------- LOAD BENCHMARK ----------------
+# Drives app.py headlessly with Streamlit's AppTest. AppTest is not safe to
+# run from several threads at once, so each simulated session gets its own
+# process; they all hit the same SQLite file, which is where contention
+# shows up: "database is locked" errors, and busy waits, i.e. time a
+# session's BEGIN IMMEDIATE spent waiting for another session's write.
+# writer_lock_waits only counts waits between threads inside one session
+# process (the group-commit writer and the outbox workers).
+#
+#   python benchmark.py --sessions 20 --duration 15 --output bench.json
+#
+# The database is a fresh temp file unless --db is given.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_FILE = os.path.join(BASE_DIR, "app.py")
+SCENARIOS = ["home", "adjust_quantity", "confirm_order", "admin_orders"]
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# ---------------- SESSIONS ----------------
+class Session:
+
+    def __init__(self, timeout):
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(APP_FILE, default_timeout=timeout)
+        self.latencies = []
+        self.errors = 0
+
+    def run(self, action=None):
+        start = time.perf_counter()
+        if action is None:
+            self.at.run()
+        else:
+            action(self.at).run()
+        self.latencies.append(time.perf_counter() - start)
+        if self.at.exception:
+            self.errors += 1
+
+    def open_page(self, page):
+        self.run()
+        self.run(lambda at: at.sidebar.radio[0].set_value(page))
+
+
+def _widget(elements, label):
+    return [e for e in elements if e.label == label][0]
+
+
+def setup_home(session):
+    session.open_page("🏠 Home")
+
+
+def step_home(session, i):
+    # What the old 3 second auto-refresh cost per tab
+    session.run()
+
+
+def setup_order(session):
+    session.open_page("🛒 Customer Order")
+    session.run(lambda at: _widget(at.text_input, "Customer Name").input("Bench"))
+    session.run(lambda at: _widget(at.text_input, "Mobile Number").input("9000000000"))
+    session.run(lambda at: _widget(at.text_area, "Delivery Address").input("Chennai"))
+    session.run(lambda at: _widget(at.text_input, "Pincode").input("600116"))
+
+
+def step_adjust_quantity(session, i):
+    session.run(lambda at: _widget(at.number_input, "Quantity (Liters)").set_value(i % 100 + 1))
+
+
+def step_confirm_order(session, i):
+    session.run(lambda at: _widget(at.button, "✅ Confirm Order").click())
+
+
+def setup_admin(session):
+    session.open_page("🔐 Admin Login")
+    session.run(lambda at: _widget(at.text_input, "Admin Username").input("admin"))
+    session.run(lambda at: _widget(at.text_input, "Admin Password").input("admin123"))
+    session.run(lambda at: _widget(at.button, "Login").click())
+    session.run(lambda at: _widget(at.radio, "Admin Options").set_value("View Orders"))
+
+
+def step_admin_orders(session, i):
+    session.run()
+
+
+SCENARIO_STEPS = {
+    "home": (setup_home, step_home),
+    "adjust_quantity": (setup_order, step_adjust_quantity),
+    "confirm_order": (setup_order, step_confirm_order),
+    "admin_orders": (setup_admin, step_admin_orders),
+}
+
+
+# ---------------- RUNNER ----------------
+def count_orders(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def session_worker(name, db_path, timeout, start_at, duration):
+    # Runs in its own process: one session, setup first, then steps until
+    # the shared deadline. Returns raw measurements to the parent.
+    os.environ["PHENYL_SHOP_DB"] = db_path
+    sys.path.insert(0, BASE_DIR)
+    import db
+
+    setup, step = SCENARIO_STEPS[name]
+    session = Session(timeout)
+    setup(session)
+    session.latencies = []
+    session.errors = 0
+    locked = 0
+    pool = db.get_pool()
+    waits, wait_seconds = pool.lock_waits, pool.lock_wait_seconds
+    busy, busy_seconds = pool.busy_waits, pool.busy_wait_seconds
+
+    time.sleep(max(0.0, start_at - time.time()))
+    i = 0
+    while time.time() < start_at + duration:
+        step(session, i)
+        locked += sum("locked" in str(e.value) for e in session.at.exception)
+        i += 1
+    return {
+        "latencies": session.latencies,
+        "errors": session.errors,
+        "locked_errors": locked,
+        "busy_waits": pool.busy_waits - busy,
+        "busy_wait_seconds": pool.busy_wait_seconds - busy_seconds,
+        "lock_waits": pool.lock_waits - waits,
+        "lock_wait_seconds": pool.lock_wait_seconds - wait_seconds,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_scenario(name, sessions, duration, timeout, db_path, startup):
+    orders_before = count_orders(db_path)
+    # Sessions start together once every process has had time to import
+    # Streamlit and run its setup reruns
+    start_at = time.time() + startup
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(sessions) as pool:
+        results = pool.starmap(session_worker, [(name, db_path, timeout, start_at, duration)] * sessions)
+    elapsed = max(duration, time.time() - start_at)
+
+    latencies = [lat for r in results for lat in r["latencies"]]
+    orders = count_orders(db_path) - orders_before
+    return {
+        "sessions": sessions,
+        "duration_s": round(elapsed, 3),
+        "reruns": len(latencies),
+        "reruns_per_s": round(len(latencies) / elapsed, 2),
+        "errors": sum(r["errors"] for r in results),
+        "latency_ms": {
+            "p50": _ms(percentile(latencies, 50)),
+            "p95": _ms(percentile(latencies, 95)),
+            "p99": _ms(percentile(latencies, 99)),
+            "mean": _ms(statistics.fmean(latencies) if latencies else None),
+            "max": _ms(max(latencies) if latencies else None),
+        },
+        "orders": orders,
+        "orders_per_s": round(orders / elapsed, 2),
+        "locked_errors": sum(r["locked_errors"] for r in results),
+        "busy_waits": sum(r["busy_waits"] for r in results),
+        "busy_wait_ms": round(sum(r["busy_wait_seconds"] for r in results) * 1000, 1),
+        "writer_lock_waits": sum(r["lock_waits"] for r in results),
+        "writer_lock_wait_ms": round(sum(r["lock_wait_seconds"] for r in results) * 1000, 1),
+        "peak_session_rss_mb": max(r["peak_rss_mb"] for r in results),
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def peak_rss_mb():
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def restock(db_path, stock):
+    # Keeps confirm_order from running out of stock mid-benchmark
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("""
+            INSERT INTO stock_movements(product_id, kind, quantity, note)
+            SELECT product_id, 'adjustment', ? - stock, 'benchmark restock' FROM product_stock
+        """, (stock,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session benchmark for app.py")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("--scenario", choices=SCENARIOS + ["all"], default="all")
+    parser.add_argument("--timeout", type=float, default=60, help="per-rerun timeout in seconds")
+    parser.add_argument("--startup", type=float, default=10,
+                        help="seconds allowed for session processes to start before measuring")
+    parser.add_argument("--db", help="database file (default: fresh temp file)")
+    parser.add_argument("--output", help="write the JSON report here as well as stdout")
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    if args.db:
+        db_path = os.path.abspath(args.db)
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmpdir.name, "bench.db")
+    # Creates the schema and seeds products before any session starts
+    os.environ["PHENYL_SHOP_DB"] = db_path
+    sys.path.insert(0, BASE_DIR)
+    import db
+    db.get_pool()
+    restock(db_path, 10 ** 9)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "scenarios": {},
+    }
+    scenarios = SCENARIOS if args.scenario == "all" else [args.scenario]
+    for name in scenarios:
+        print(f"Running {name} with {args.sessions} sessions for {args.duration}s...", file=sys.stderr)
+        report["scenarios"][name] = run_scenario(name, args.sessions, args.duration, args.timeout, db_path, args.startup)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if tmpdir is not None:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import argparse
+import csv
+import sys
+import time
+from db import get_pool, fetchall, invalidate_catalog, compact_stock
+
+# ---------------- BULK CATALOG TOOL ----------------
+# Reprices, restocks or loads the whole catalog from a spreadsheet (CSV)
+# without starting Streamlit. Every command validates the whole file first,
+# prints the diff against the database, and then applies it with
+# executemany in a single transaction (nothing is written with --dry-run).
+#
+#   python catalog.py upsert products.csv     name,price[,stock][,description]
+#   python catalog.py prices prices.csv       name,price
+#   python catalog.py restock delivery.csv    name,quantity[,note]
+#   python catalog.py dump catalog.csv        current catalog in upsert format
+#
+# stock in an upsert file is the opening stock of new products; stock of
+# existing products only changes through restock (or the admin Inventory
+# page), so the ledger keeps every movement. Running app servers pick the
+# changes up within db.CATALOG_MAX_AGE seconds.
+
+DIFF_LINES = 20  # changes printed per kind; the rest are counted
+
+
+class CatalogFileError(Exception):
+    pass
+
+
+def _int(value, field, line, minimum):
+    try:
+        number = int(str(value).strip())
+    except ValueError:
+        raise CatalogFileError(f"line {line}: {field} must be a whole number, got {value!r}")
+    if number < minimum:
+        raise CatalogFileError(f"line {line}: {field} must be at least {minimum}")
+    return number
+
+
+def read_rows(path, required, optional=()):
+    # [(line, {column: value})]; raises CatalogFileError listing every problem
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        columns = [c.strip().lower() for c in reader.fieldnames or []]
+        missing = [c for c in required if c not in columns]
+        if missing:
+            raise CatalogFileError(f"{path}: missing column(s) {', '.join(missing)}")
+        reader.fieldnames = columns
+        wanted = list(required) + [c for c in optional if c in columns]
+        return [(line, {c: (row.get(c) or "").strip() for c in wanted})
+                for line, row in enumerate(reader, start=2)]
+
+
+def _parse(rows, parse_row):
+    parsed = []
+    errors = []
+    seen = {}
+    for line, row in rows:
+        try:
+            item = parse_row(line, row)
+        except CatalogFileError as e:
+            errors.append(str(e))
+            continue
+        if item["name"] in seen:
+            errors.append(f"line {line}: {item['name']!r} already appears on line {seen[item['name']]}")
+            continue
+        seen[item["name"]] = line
+        parsed.append(item)
+    if errors:
+        more = f"\n... and {len(errors) - DIFF_LINES} more" if len(errors) > DIFF_LINES else ""
+        raise CatalogFileError("\n".join(errors[:DIFF_LINES]) + more)
+    return parsed
+
+
+def _parse_name(line, row):
+    if not row["name"]:
+        raise CatalogFileError(f"line {line}: name is empty")
+    return row["name"]
+
+
+def current_catalog():
+    # {name: (id, price, stock, description)}
+    rows = fetchall("""
+        SELECT p.id, p.name, p.price, ps.stock, p.description
+        FROM products p JOIN product_stock ps ON ps.product_id = p.id
+    """)
+    return {name: (id, price, stock, description) for id, name, price, stock, description in rows}
+
+
+def _print_changes(title, lines):
+    if not lines:
+        return
+    print(f"{title} ({len(lines)}):")
+    for text in lines[:DIFF_LINES]:
+        print(f"  {text}")
+    if len(lines) > DIFF_LINES:
+        print(f"  ... and {len(lines) - DIFF_LINES} more")
+
+
+# ---------------- UPSERT ----------------
+def plan_upsert(items, catalog):
+    inserts = []
+    price_updates = []
+    description_updates = []
+    for item in items:
+        existing = catalog.get(item["name"])
+        if existing is None:
+            inserts.append(item)
+            continue
+        if item["price"] != existing[1]:
+            price_updates.append((item, existing))
+        if item["description"] is not None and item["description"] != (existing[3] or ""):
+            description_updates.append((item, existing))
+    return inserts, price_updates, description_updates
+
+
+def upsert(path, dry_run=False):
+    def parse_row(line, row):
+        return {
+            "name": _parse_name(line, row),
+            "price": _int(row["price"], "price", line, 1),
+            "stock": _int(row["stock"], "stock", line, 0) if row.get("stock") else 0,
+            # A missing column or an empty cell leaves the description alone
+            "description": row.get("description") or None,
+        }
+
+    timings = Timings()
+    items = _parse(read_rows(path, ["name", "price"], ["stock", "description"]), parse_row)
+    timings.lap("read", len(items))
+    inserts, price_updates, description_updates = plan_upsert(items, current_catalog())
+    timings.lap("diff")
+
+    _print_changes("New products", [f"+ {i['name']}  ₹{i['price']}  {i['stock']} L" for i in inserts])
+    _print_changes("Price changes", [f"~ {i['name']}  ₹{e[1]} -> ₹{i['price']}" for i, e in price_updates])
+    _print_changes("Description changes", [f"~ {i['name']}" for i, _ in description_updates])
+    changes = len(inserts) + len(price_updates) + len(description_updates)
+    updated = {i["name"] for i, _ in price_updates + description_updates}
+    print(f"{len(items)} rows: {len(inserts)} new, {len(price_updates)} repriced, "
+          f"{len(description_updates)} described, {len(items) - len(inserts) - len(updated)} unchanged")
+
+    if not dry_run and changes:
+        with get_pool().write() as conn:
+            conn.executemany("INSERT INTO products(name, price, description) VALUES(?,?,?)",
+                             [(i["name"], i["price"], i["description"]) for i in inserts])
+            conn.executemany("""
+                INSERT INTO stock_movements(product_id, kind, quantity, note)
+                SELECT id, 'opening', ?, ? FROM products WHERE name = ?
+            """, [(i["stock"], f"Imported from {path}", i["name"]) for i in inserts])
+            # Price-only updates leave the search index triggers alone
+            conn.executemany("UPDATE products SET price = ? WHERE id = ?",
+                             [(i["price"], e[0]) for i, e in price_updates])
+            conn.executemany("UPDATE products SET description = ? WHERE id = ?",
+                             [(i["description"], e[0]) for i, e in description_updates])
+        _after_write(bool(inserts))
+        timings.lap("write", changes)
+    timings.report(dry_run or not changes)
+
+
+# ---------------- PRICES ----------------
+def prices(path, dry_run=False):
+    def parse_row(line, row):
+        return {"name": _parse_name(line, row), "price": _int(row["price"], "price", line, 1)}
+
+    timings = Timings()
+    items = _parse(read_rows(path, ["name", "price"]), parse_row)
+    timings.lap("read", len(items))
+    catalog = current_catalog()
+    _check_known(items, catalog)
+    updates = [(i, catalog[i["name"]]) for i in items if i["price"] != catalog[i["name"]][1]]
+    timings.lap("diff")
+
+    _print_changes("Price changes", [f"~ {i['name']}  ₹{e[1]} -> ₹{i['price']}" for i, e in updates])
+    print(f"{len(items)} rows: {len(updates)} repriced, {len(items) - len(updates)} unchanged")
+
+    if not dry_run and updates:
+        with get_pool().write() as conn:
+            conn.executemany("UPDATE products SET price = ? WHERE id = ?", [(i["price"], e[0]) for i, e in updates])
+        _after_write(False)
+        timings.lap("write", len(updates))
+    timings.report(dry_run or not updates)
+
+
+# ---------------- RESTOCK ----------------
+def restock(path, dry_run=False, note=None):
+    def parse_row(line, row):
+        return {"name": _parse_name(line, row), "quantity": _int(row["quantity"], "quantity", line, 1),
+                "note": row.get("note") or note or f"Restock from {path}"}
+
+    timings = Timings()
+    items = _parse(read_rows(path, ["name", "quantity"], ["note"]), parse_row)
+    timings.lap("read", len(items))
+    catalog = current_catalog()
+    _check_known(items, catalog)
+    timings.lap("diff")
+
+    _print_changes("Restocks", [f"+ {i['name']}  {catalog[i['name']][2]} L -> {catalog[i['name']][2] + i['quantity']} L"
+                                for i in items])
+    print(f"{len(items)} rows: {sum(i['quantity'] for i in items)} L across {len(items)} products")
+
+    if not dry_run and items:
+        with get_pool().write() as conn:
+            conn.executemany("INSERT INTO stock_movements(product_id, kind, quantity, note) VALUES(?, 'restock', ?, ?)",
+                             [(catalog[i["name"]][0], i["quantity"], i["note"]) for i in items])
+        _after_write(True)
+        timings.lap("write", len(items))
+    timings.report(dry_run or not items)
+
+
+def _check_known(items, catalog):
+    unknown = [i["name"] for i in items if i["name"] not in catalog]
+    if unknown:
+        more = f" and {len(unknown) - DIFF_LINES} more" if len(unknown) > DIFF_LINES else ""
+        raise CatalogFileError(f"unknown products: {', '.join(unknown[:DIFF_LINES])}{more}")
+
+
+def _after_write(stock_moved):
+    # Bulk movements skip the per-write compaction check, so fold them now
+    if stock_moved:
+        compact_stock()
+    invalidate_catalog()
+
+
+# ---------------- DUMP ----------------
+def dump(path):
+    timings = Timings()
+    catalog = current_catalog()
+    out = sys.stdout if path == "-" else open(path, "w", newline="", encoding="utf-8")
+    try:
+        writer = csv.writer(out)
+        writer.writerow(["name", "price", "stock", "description"])
+        writer.writerows((name, price, stock, description or "")
+                         for name, (_, price, stock, description) in sorted(catalog.items()))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    timings.lap("dump", len(catalog))
+    timings.report(False)
+
+
+# ---------------- TIMING ----------------
+class Timings:
+
+    def __init__(self):
+        self.start = self.last = time.perf_counter()
+        self.laps = []
+
+    def lap(self, name, rows=None):
+        now = time.perf_counter()
+        self.laps.append((name, now - self.last, rows))
+        self.last = now
+
+    def report(self, nothing_written):
+        parts = []
+        for name, seconds, rows in self.laps:
+            rate = f", {rows / seconds:,.0f} rows/s" if rows and seconds > 0 else ""
+            parts.append(f"{name} {seconds:.3f}s{rate}")
+        total = time.perf_counter() - self.start
+        suffix = " (nothing written)" if nothing_written else ""
+        print(f"Done in {total:.2f}s: " + "; ".join(parts) + suffix, file=sys.stderr)
+
+
+# ---------------- COMMAND LINE ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk catalog, price and stock updates from CSV")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help in (("upsert", "add new products and update prices/descriptions"),
+                       ("prices", "update prices of existing products"),
+                       ("restock", "add stock to existing products")):
+        command = sub.add_parser(name, help=help)
+        command.add_argument("file")
+        command.add_argument("--dry-run", action="store_true", help="show the changes without writing them")
+        if name == "restock":
+            command.add_argument("--note", help="note for rows without one")
+    dump_command = sub.add_parser("dump", help="write the catalog as CSV")
+    dump_command.add_argument("file", help="output file, or - for stdout")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "upsert":
+            upsert(args.file, args.dry_run)
+        elif args.command == "prices":
+            prices(args.file, args.dry_run)
+        elif args.command == "restock":
+            restock(args.file, args.dry_run, args.note)
+        else:
+            dump(args.file)
+    except (CatalogFileError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,741 @@
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager, nullcontext
+from migrations import migrate
+from perf import count, record, timed, timer
+
+# ---------------- SETTINGS ----------------
+DB_PATH = os.environ.get("PHENYL_SHOP_DB", "phenyl_shop.db")
+READ_POOL_SIZE = 4
+BUSY_TIMEOUT_MS = 5000
+BUSY_WAIT_THRESHOLD = 0.001  # seconds; a slower BEGIN IMMEDIATE waited on another process
+CATALOG_MAX_AGE = 30  # seconds; picks up writes made by other processes
+STOCK_COMPACT_EVERY = 500  # stock movements between snapshot compactions
+WRITE_BATCH_SIZE = int(os.environ.get("PHENYL_WRITE_BATCH_SIZE", 64))  # writes per group commit
+WRITE_BATCH_LATENCY = float(os.environ.get("PHENYL_WRITE_BATCH_LATENCY_MS", 2)) / 1000  # max wait for more
+WRITE_TIMEOUT = float(os.environ.get("PHENYL_WRITE_TIMEOUT", 30))  # seconds a caller waits for its commit
+
+
+# ---------------- CONNECTION POOL ----------------
+# One writer connection (serialized by a lock) plus a small pool of
+# read-only connections. In WAL mode readers never wait for the writer.
+
+def _connect(path, read_only=False):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000,
+                           check_same_thread=False, isolation_level=None)
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA foreign_keys = ON")
+    if read_only:
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        conn.execute("PRAGMA journal_mode = WAL")
+        # FULL syncs the WAL on every commit, so an acknowledged write
+        # survives a power cut; group commit pays that once per batch
+        conn.execute("PRAGMA synchronous = FULL")
+    return conn
+
+
+@contextmanager
+def _attached(conn, path, alias):
+    # ATTACH/DETACH cannot run inside a transaction
+    conn.execute(f"ATTACH DATABASE ? AS {alias}", (path,))
+    try:
+        yield
+    finally:
+        conn.execute(f"DETACH DATABASE {alias}")
+
+
+class ConnectionPool:
+
+    def __init__(self, path=DB_PATH, readers=READ_POOL_SIZE):
+        self.path = path
+        # Writer first: it creates the file, switches it to WAL and
+        # brings the schema up to date before any reader is handed out
+        self._writer = _connect(path)
+        migrate(self._writer)
+        self._write_lock = threading.Lock()
+        # Contention counters: how often a writer had to wait, and for how long.
+        # lock_* counts waits for the write lock between threads of this
+        # process; busy_* counts BEGIN IMMEDIATE waiting out SQLite's busy
+        # timeout while another process (or connection) held the database.
+        self.lock_waits = 0
+        self.lock_wait_seconds = 0.0
+        self.busy_waits = 0
+        self.busy_wait_seconds = 0.0
+        self._readers = queue.Queue()
+        for _ in range(readers):
+            self._readers.put(_connect(path, read_only=True))
+
+    @contextmanager
+    def read(self, attach=None):
+        # attach=(path, alias) makes another database file readable as
+        # alias.<table> for the duration of the block
+        conn = self._readers.get()
+        try:
+            with _attached(conn, *attach) if attach is not None else nullcontext():
+                yield conn
+        finally:
+            self._readers.put(conn)
+
+    def _acquire_writer(self):
+        if self._write_lock.acquire(blocking=False):
+            return
+        start = time.perf_counter()
+        self._write_lock.acquire()
+        self.lock_waits += 1
+        self.lock_wait_seconds += time.perf_counter() - start
+
+    @contextmanager
+    def write(self, attach=None):
+        # One transaction per block: committed on exit, rolled back on error.
+        # With attach, a commit is atomic per database file, not across them.
+        self._acquire_writer()
+        try:
+            conn = self._writer
+            with _attached(conn, *attach) if attach is not None else nullcontext():
+                start = time.perf_counter()
+                conn.execute("BEGIN IMMEDIATE")
+                waited = time.perf_counter() - start
+                if waited > BUSY_WAIT_THRESHOLD:
+                    self.busy_waits += 1
+                    self.busy_wait_seconds += waited
+                try:
+                    yield conn
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                conn.execute("COMMIT")
+        finally:
+            self._write_lock.release()
+
+    def vacuum(self):
+        # Rebuilds the file to return free pages to the OS and truncates the
+        # WAL. Holds the writer for the whole run; readers keep working.
+        self._acquire_writer()
+        try:
+            self._writer.execute("VACUUM")
+            self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            self._write_lock.release()
+
+    def close(self):
+        with self._write_lock:
+            self._writer.close()
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    # Created once per process and shared by every session thread,
+    # the same lifetime st.cache_resource would give it
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_PATH)
+    return _pool
+
+
+def fetchall(sql, params=()):
+    with get_pool().read() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, params)
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+
+def execute(sql, params=()):
+    with get_pool().write() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, params)
+            return cur.lastrowid
+        finally:
+            cur.close()
+
+
+# ---------------- GROUP COMMIT ----------------
+# Order, product and stock writes from session threads are queued to one
+# writer thread per process instead of each taking the write lock and
+# paying for its own commit. The writer takes whatever is queued, up to
+# WRITE_BATCH_SIZE, waiting at most WRITE_BATCH_LATENCY for more, and runs
+# it as one transaction. Each write gets its own SAVEPOINT, so one that
+# fails rolls back alone. Callers wait on a Future resolved after COMMIT.
+
+class GroupCommitWriter:
+
+    def __init__(self, pool, batch_size=WRITE_BATCH_SIZE, latency=WRITE_BATCH_LATENCY):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.latency = latency
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def is_alive(self):
+        return self._thread.is_alive()
+
+    def submit(self, op):
+        # op(cur) runs inside the group transaction; returns a Future
+        future = Future()
+        self._queue.put((op, future))
+        return future
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.latency
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit(self, batch):
+        outcomes = []
+        start = time.perf_counter()
+        with self.pool.write() as conn:
+            cur = conn.cursor()
+            try:
+                for op, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    cur.execute("SAVEPOINT op")
+                    try:
+                        result = op(cur)
+                    except Exception as e:
+                        cur.execute("ROLLBACK TO op")
+                        cur.execute("RELEASE op")
+                        outcomes.append((future, None, e))
+                    else:
+                        cur.execute("RELEASE op")
+                        outcomes.append((future, result, None))
+            finally:
+                cur.close()
+        # Only now are the writes durable (synchronous = FULL) and visible to readers
+        record("db.group_commit", time.perf_counter() - start)
+        count("db.group_commits")
+        count("db.group_commit_writes", len(outcomes))
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._commit(batch)
+            except Exception as e:
+                # BEGIN or COMMIT failed: nothing in the batch was written
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = GroupCommitWriter(get_pool()).start()
+    return _writer
+
+
+def run_write(op, timeout=WRITE_TIMEOUT):
+    # Runs op(cur) on the writer thread and returns its result (or raises).
+    # Raises RuntimeError instead of blocking forever if the writer thread
+    # has died or the commit does not finish within timeout.
+    writer = get_writer()
+    if not writer.is_alive():
+        raise RuntimeError("database writer thread is not running")
+    future = writer.submit(op)
+    try:
+        return future.result(timeout)
+    except FutureTimeout:
+        if future.cancel():
+            raise RuntimeError(f"database write not started within {timeout}s; nothing was written")
+        raise RuntimeError(f"database write did not commit within {timeout}s; it may still be written")
+
+
+# ---------------- CATALOG CACHE ----------------
+# Products are read far more often than they change, so readers share an
+# in-memory snapshot indexed by id and name. Every product write in this
+# module bumps _catalog_version, which makes the next reader rebuild it.
+
+class Catalog:
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.rows = rows
+        self.by_id = {row[0]: row for row in rows}
+        self.by_name = {row[1]: row for row in rows}
+
+
+_catalog = None
+_catalog_version = 0
+_catalog_lock = threading.Lock()
+
+
+def invalidate_catalog():
+    global _catalog_version
+    with _catalog_lock:
+        _catalog_version += 1
+
+
+def get_catalog():
+    global _catalog
+    catalog = _catalog
+    if (catalog is not None and catalog.version == _catalog_version
+            and time.monotonic() - catalog.loaded_at < CATALOG_MAX_AGE):
+        return catalog
+    # Version is read before the query: a write that lands while we load
+    # bumps it again, so a stale snapshot is replaced on the next read
+    version = _catalog_version
+    with timer("db.catalog_load"):
+        rows = fetchall("SELECT p.id, p.name, p.price, ps.stock FROM products p JOIN product_stock ps ON ps.product_id = p.id")
+    catalog = Catalog(version, rows)
+    with _catalog_lock:
+        if _catalog is None or _catalog.version <= version:
+            _catalog = catalog
+    return catalog
+
+
+# ---------------- PRODUCTS ----------------
+@timed("db.add_product")
+def add_product(name, price, stock, description=None):
+    # Returns the new product id, or None when the name is already taken.
+    # The initial stock is the product's opening movement in the ledger.
+    def op(cur):
+        cur.execute("INSERT INTO products(name, price, description) VALUES(?,?,?) ON CONFLICT(name) DO NOTHING",
+                    (name, price, description))
+        if cur.rowcount == 0:
+            return None
+        product_id = cur.lastrowid
+        _move_stock(cur, product_id, "opening", stock, note="Initial stock")
+        return product_id
+
+    product_id = run_write(op)
+    if product_id is not None:
+        invalidate_catalog()
+    return product_id
+
+
+@timed("db.delete_product")
+def delete_product(product_id):
+    run_write(lambda cur: cur.execute("DELETE FROM products WHERE id=?", (product_id,)).rowcount)
+    invalidate_catalog()
+
+
+@timed("db.get_products")
+def get_products():
+    return get_catalog().rows
+
+
+@timed("db.get_product")
+def get_product(product_id):
+    return get_catalog().by_id.get(product_id)
+
+
+@timed("db.get_product_by_name")
+def get_product_by_name(name):
+    return get_catalog().by_name.get(name)
+
+
+@timed("db.update_stock")
+def update_stock(product_id, quantity):
+    # Takes quantity out of stock as a manual adjustment
+    return record_stock_movement(product_id, "adjustment", -quantity)
+
+
+# ---------------- INVENTORY LEDGER ----------------
+# Every stock change is appended to stock_movements; nothing is updated in
+# place. Current stock (the product_stock view) is the product's snapshot
+# plus the movements after it. Every STOCK_COMPACT_EVERY movements the tail
+# is folded into the snapshots, so a stock read sums at most that many rows
+# however long the history gets.
+
+MOVEMENT_KINDS = ["opening", "sale", "restock", "return", "adjustment"]
+MANUAL_MOVEMENT_KINDS = ["restock", "return", "adjustment"]
+
+
+def _current_stock(cur, product_id):
+    row = cur.execute("SELECT stock FROM product_stock WHERE product_id = ?", (product_id,)).fetchone()
+    return None if row is None else row[0]
+
+
+def _compact_stock(cur):
+    # Folds every movement so far into the snapshots; returns how many
+    top = cur.execute("SELECT COALESCE(MAX(id), 0) FROM stock_movements").fetchone()[0]
+    folded = cur.execute("SELECT COUNT(*) FROM stock_movements m JOIN stock_snapshots s ON s.product_id = m.product_id "
+                         "WHERE m.id > s.movement_id").fetchone()[0]
+    cur.execute("""
+        UPDATE stock_snapshots SET
+            stock = stock + COALESCE((SELECT SUM(m.quantity) FROM stock_movements m
+                                      WHERE m.product_id = stock_snapshots.product_id
+                                        AND m.id > stock_snapshots.movement_id AND m.id <= ?), 0),
+            movement_id = ?,
+            taken_at = datetime('now', 'localtime')
+        WHERE movement_id < ?
+    """, (top, top, top))
+    return folded
+
+
+def _move_stock(cur, product_id, kind, quantity, order_id=None, note=None):
+    # Runs inside an open write transaction; callers check stock first
+    cur.execute("INSERT INTO stock_movements(product_id, kind, quantity, order_id, note) VALUES(?,?,?,?,?)",
+                (product_id, kind, quantity, order_id, note))
+    movement_id = cur.lastrowid
+    if movement_id % STOCK_COMPACT_EVERY == 0:
+        with timer("db.compact_stock"):
+            _compact_stock(cur)
+    return movement_id
+
+
+@timed("db.record_stock_movement")
+def record_stock_movement(product_id, kind, quantity, note=None):
+    # Restocks and returns add stock; adjustments are signed corrections.
+    # Returns the movement id, or None for an unknown product or when the
+    # movement would take stock below zero.
+    if kind not in MANUAL_MOVEMENT_KINDS:
+        raise ValueError(f"kind must be one of {MANUAL_MOVEMENT_KINDS}")
+    if kind != "adjustment" and quantity <= 0:
+        raise ValueError(f"{kind} quantity must be positive")
+    def op(cur):
+        stock = _current_stock(cur, product_id)
+        if stock is None or stock + quantity < 0:
+            return None
+        return _move_stock(cur, product_id, kind, quantity, note=note)
+
+    movement_id = run_write(op)
+    invalidate_catalog()
+    return movement_id
+
+
+@timed("db.get_stock")
+def get_stock(product_id):
+    # Read straight from the ledger; get_product() serves the cached value
+    rows = fetchall("SELECT stock FROM product_stock WHERE product_id = ?", (product_id,))
+    return rows[0][0] if rows else None
+
+
+@timed("db.get_stock_movements")
+def get_stock_movements(product_id=None, kind=None, before_id=None, limit=50):
+    # Newest first; pass the last id of the previous page as before_id
+    clauses = []
+    params = []
+    if product_id is not None:
+        clauses.append("m.product_id = ?")
+        params.append(product_id)
+    if kind:
+        clauses.append("m.kind = ?")
+        params.append(kind)
+    if before_id is not None:
+        clauses.append("m.id < ?")
+        params.append(before_id)
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    return fetchall(f"""
+        SELECT m.id, m.created_at, COALESCE(p.name, 'Deleted product'), m.kind, m.quantity, m.order_id, m.note
+        FROM stock_movements m LEFT JOIN products p ON p.id = m.product_id{where}
+        ORDER BY m.id DESC LIMIT ?
+    """, params + [limit])
+
+
+@timed("db.compact_stock")
+def compact_stock():
+    with get_pool().write() as conn:
+        cur = conn.cursor()
+        try:
+            return _compact_stock(cur)
+        finally:
+            cur.close()
+
+
+# ---------------- PRODUCT SEARCH ----------------
+# Word-prefix matches from products_fts come first, ranked by bm25. If that
+# finds fewer than `limit`, names sharing the most trigrams with the search
+# words fill the rest, which catches typos like "lavendar" or "phenil".
+# Results are cached per search and dropped with the catalog snapshot, so a
+# rerun with the same search text (every widget change on the order page)
+# does not query again.
+
+SEARCH_LIMIT = 20
+SEARCH_CACHE_SIZE = 256  # distinct searches kept
+
+_search_cache = {}
+
+
+def _search_words(query):
+    return re.findall(r"\w+", query.lower())
+
+
+@timed("db.search_products")
+def search_products(query, limit=SEARCH_LIMIT):
+    words = _search_words(query or "")
+    key = (tuple(words), limit)
+    cached = _search_cache.get(key)
+    if (cached is not None and cached[0] == _catalog_version
+            and time.monotonic() - cached[1] < CATALOG_MAX_AGE):
+        return cached[2]
+    # Version read before the query, as in get_catalog
+    version = _catalog_version
+    loaded_at = time.monotonic()
+    with timer("db.search_query"):
+        rows = _search(words, limit)
+    with _catalog_lock:
+        if len(_search_cache) >= SEARCH_CACHE_SIZE:
+            _search_cache.clear()
+        _search_cache[key] = (version, loaded_at, rows)
+    return rows
+
+
+def _search(words, limit):
+    if not words:
+        return fetchall("""
+            SELECT p.id, p.name, p.price, ps.stock FROM products p
+            JOIN product_stock ps ON ps.product_id = p.id ORDER BY p.name LIMIT ?
+        """, (limit,))
+
+    prefix_query = " AND ".join(f'"{w}"*' for w in words)
+    rows = fetchall("""
+        SELECT p.id, p.name, p.price, ps.stock FROM products_fts
+        JOIN products p ON p.id = products_fts.rowid
+        JOIN product_stock ps ON ps.product_id = p.id
+        WHERE products_fts MATCH ? ORDER BY bm25(products_fts) LIMIT ?
+    """, (prefix_query, limit))
+    if len(rows) >= limit:
+        return rows
+
+    trigrams = {w[i:i + 3] for w in words for i in range(len(w) - 2)}
+    if not trigrams:
+        return rows
+    seen = [row[0] for row in rows]
+    fuzzy_query = " OR ".join(f'"{t}"' for t in sorted(trigrams))
+    rows += fetchall(f"""
+        SELECT p.id, p.name, p.price, ps.stock FROM products_trigram
+        JOIN products p ON p.id = products_trigram.rowid
+        JOIN product_stock ps ON ps.product_id = p.id
+        WHERE products_trigram MATCH ? AND p.id NOT IN ({",".join("?" * len(seen))})
+        ORDER BY bm25(products_trigram) LIMIT ?
+    """, [fuzzy_query] + seen + [limit - len(rows)])
+    return rows
+
+
+# ---------------- SALES SUMMARY ----------------
+# Called inside the order transaction so the aggregates never drift from
+# the orders table. Orders without a timestamp are not counted.
+
+def _record_sale(cur, order_id):
+    cur.execute("""
+        INSERT INTO sales_daily(day, orders, litres, revenue)
+        SELECT date(created_at), 1, quantity, total_price FROM orders WHERE id = ? AND created_at IS NOT NULL
+        ON CONFLICT(day) DO UPDATE SET
+            orders = orders + excluded.orders,
+            litres = litres + excluded.litres,
+            revenue = revenue + excluded.revenue
+    """, (order_id,))
+    cur.execute("""
+        INSERT INTO sales_product_daily(day, product, orders, litres, revenue)
+        SELECT date(created_at), COALESCE(product, 'Unknown'), 1, quantity, total_price FROM orders WHERE id = ? AND created_at IS NOT NULL
+        ON CONFLICT(day, product) DO UPDATE SET
+            orders = orders + excluded.orders,
+            litres = litres + excluded.litres,
+            revenue = revenue + excluded.revenue
+    """, (order_id,))
+    cur.execute("""
+        INSERT INTO sales_payment_daily(day, payment_method, orders, revenue)
+        SELECT date(created_at), COALESCE(payment_method, 'Unknown'), 1, total_price FROM orders WHERE id = ? AND created_at IS NOT NULL
+        ON CONFLICT(day, payment_method) DO UPDATE SET
+            orders = orders + excluded.orders,
+            revenue = revenue + excluded.revenue
+    """, (order_id,))
+
+
+# ---------------- NOTIFICATION OUTBOX ----------------
+# One confirmation for the customer and one alert for the shop per order,
+# queued in the order transaction and sent by notify.py's worker
+
+def _enqueue_order_notifications(cur, order_id):
+    cur.execute("""
+        INSERT INTO outbox(order_id, kind, recipient, payload)
+        SELECT id, kind, CASE kind WHEN 'order_confirmation' THEN phone END,
+               json_object('order_id', id, 'customer_name', customer_name, 'phone', phone,
+                           'address', address, 'pincode', pincode, 'product', product,
+                           'quantity', quantity, 'total_price', total_price, 'delivery_charge', delivery_charge,
+                           'payment_method', payment_method, 'created_at', created_at)
+        FROM orders, (SELECT 'order_confirmation' AS kind UNION ALL SELECT 'admin_alert')
+        WHERE id = ?
+    """, (order_id,))
+
+
+# ---------------- ORDERS ----------------
+def _insert_order(cur, customer_name, phone, address, pincode, product_id, quantity, total_price, payment_method, upi_id,
+                  delivery_charge=0):
+    # Runs inside an open write transaction. Stock is checked and the sale
+    # movement written under the write lock, so concurrent orders cannot
+    # oversell. total_price is the products only; the customer pays it plus
+    # delivery_charge. Returns the new order id, or None when stock is not available.
+    stock = _current_stock(cur, product_id)
+    if stock is None or stock < quantity:
+        return None
+    cur.execute("""
+        INSERT INTO orders(customer_name, phone, address, pincode, product_id, product,
+                           quantity, total_price, payment_method, upi_id, delivery_charge)
+        SELECT ?, ?, ?, ?, id, name, ?, ?, ?, ?, ? FROM products WHERE id = ?
+    """, (customer_name, phone, address, pincode, quantity, total_price, payment_method, upi_id, delivery_charge,
+          product_id))
+    order_id = cur.lastrowid
+    _move_stock(cur, product_id, "sale", -quantity, order_id=order_id)
+    _record_sale(cur, order_id)
+    _enqueue_order_notifications(cur, order_id)
+    return order_id
+
+
+@timed("db.place_order")
+def place_order(customer_name, phone, address, pincode, product_id, quantity, total_price, payment_method, upi_id,
+                delivery_charge=0):
+    # Stock movement and order insert commit together (group commit).
+    # Returns the new order id, or None when stock is not available.
+    order_id = run_write(lambda cur: _insert_order(cur, customer_name, phone, address, pincode, product_id,
+                                                   quantity, total_price, payment_method, upi_id, delivery_charge))
+    if order_id is not None:
+        invalidate_catalog()
+    return order_id
+
+
+@timed("db.place_order_batch")
+def place_order_batch(idempotency_key, request_hash, customer_name, phone, address, pincode,
+                      payment_method, upi_id, lines, delivery_charge=0):
+    # All lines ([(product_id, quantity)]) are placed in one transaction, or
+    # none are. Prices come from the products table; the delivery charge is
+    # recorded once, on the first line's order, and the batch total_price
+    # is what the customer pays: every line plus delivery. Returns (result, replayed): an accepted
+    # batch is stored under its idempotency key, and a retry with the same
+    # key gets the stored result back instead of booking again.
+    def op(cur):
+        row = cur.execute("SELECT request_hash, response FROM api_batches WHERE idempotency_key = ?",
+                          (idempotency_key,)).fetchone()
+        if row is not None:
+            if row[0] != request_hash:
+                return {"status": "conflict",
+                        "error": "idempotency key was already used for a different request"}, True
+            return json.loads(row[1]), True
+
+        cur.execute("SAVEPOINT batch")
+        orders = []
+        errors = []
+        for line, (product_id, quantity) in enumerate(lines):
+            product = cur.execute("SELECT name, price FROM products WHERE id = ?", (product_id,)).fetchone()
+            if product is None:
+                errors.append({"line": line, "product_id": product_id, "error": "unknown product"})
+                continue
+            total_price = product[1] * quantity
+            order_id = _insert_order(cur, customer_name, phone, address, pincode, product_id, quantity,
+                                     total_price, payment_method, upi_id, delivery_charge if line == 0 else 0)
+            if order_id is None:
+                errors.append({"line": line, "product_id": product_id, "product": product[0],
+                               "error": "out of stock"})
+                continue
+            orders.append({"line": line, "order_id": order_id, "product_id": product_id,
+                           "product": product[0], "quantity": quantity, "total_price": total_price})
+
+        if errors:
+            cur.execute("ROLLBACK TO batch")
+            cur.execute("RELEASE batch")
+            return {"status": "rejected", "errors": errors}, False
+
+        cur.execute("RELEASE batch")
+        result = {"status": "accepted", "idempotency_key": idempotency_key, "orders": orders,
+                  "delivery_charge": delivery_charge,
+                  "total_price": sum(o["total_price"] for o in orders) + delivery_charge}
+        cur.execute("INSERT INTO api_batches(idempotency_key, request_hash, response) VALUES(?,?,?)",
+                    (idempotency_key, request_hash, json.dumps(result)))
+        return result, False
+
+    result, replayed = run_write(op)
+    if result["status"] == "accepted" and not replayed:
+        invalidate_catalog()
+    return result, replayed
+
+
+ORDER_COLUMNS = ("id, customer_name, phone, address, pincode, product, quantity, total_price, payment_method, upi_id, "
+                 "created_at, delivery_charge")
+
+
+@timed("db.get_orders")
+def get_orders():
+    return fetchall(f"SELECT {ORDER_COLUMNS} FROM orders")
+
+
+@timed("db.get_orders_after")
+def get_orders_after(after_id, limit=200):
+    # Orders placed after after_id, oldest first. A primary key range scan:
+    # the cost depends on how many orders are new, not on the table size.
+    return fetchall(f"SELECT {ORDER_COLUMNS} FROM orders WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit))
+
+
+def order_filters(date_from=None, date_to=None, product_id=None, payment_method=None, search=None):
+    # Builds a WHERE clause that the orders indexes can serve.
+    # date_from/date_to are inclusive datetime.date values.
+    clauses = []
+    params = []
+    if date_from is not None:
+        clauses.append("created_at >= ?")
+        params.append(date_from.isoformat())
+    if date_to is not None:
+        clauses.append("created_at < date(?, '+1 day')")
+        params.append(date_to.isoformat())
+    if product_id is not None:
+        clauses.append("product_id = ?")
+        params.append(product_id)
+    if payment_method:
+        clauses.append("payment_method = ?")
+        params.append(payment_method)
+    if search:
+        # Prefix match on phone or pincode. GLOB (unlike LIKE) is a range
+        # scan on idx_orders_phone / idx_orders_pincode, one per side of the OR
+        pattern = "".join(c for c in search.strip() if c not in "*?[]") + "*"
+        clauses.append("(phone GLOB ? OR pincode GLOB ?)")
+        params.extend([pattern, pattern])
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    return where, params
+
+
+@timed("db.query_orders")
+def query_orders(before_id=None, page_size=50, **filters):
+    # Keyset pagination, newest first: pass the last id of the previous
+    # page as before_id to fetch the next one
+    where, params = order_filters(**filters)
+    if before_id is not None:
+        where += (" AND " if where else " WHERE ") + "id < ?"
+        params.append(before_id)
+    return fetchall(f"SELECT {ORDER_COLUMNS} FROM orders{where} ORDER BY id DESC LIMIT ?",
+                     params + [page_size])
+
+
+@timed("db.count_orders")
+def count_orders(**filters):
+    where, params = order_filters(**filters)
+    return fetchall(f"SELECT COUNT(*) FROM orders{where}", params)[0][0]
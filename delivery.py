@@ -0,0 +1,90 @@
+import csv
+import os
+import threading
+from array import array
+from bisect import bisect_left
+
+# ---------------- DELIVERY ZONES ----------------
+# Opt-in: set DELIVERY_ZONES_FILE to a CSV with the columns
+# pincode,zone,charge,eta_days (the full India Post list, ~19k rows, works
+# as-is; delivery_zones.example.csv shows the format) and only those
+# pincodes can order, with the zone's delivery charge. Unset, every
+# pincode is accepted without a charge. Pincodes sit in one sorted int
+# array with a parallel array of zone numbers, so a lookup is a binary
+# search with no file or database access, and the whole index is a few
+# hundred KB.
+
+ZONES_FILE = os.environ.get("DELIVERY_ZONES_FILE")  # unset = no delivery zones
+
+class Zone:
+
+    def __init__(self, name, charge, eta_days):
+        self.name = name
+        self.charge = charge
+        self.eta_days = eta_days
+
+
+class ZoneIndex:
+
+    def __init__(self, rows):
+        # rows: iterable of (pincode, zone, charge, eta_days)
+        zone_ids = {}
+        self.zones = []
+        entries = {}
+        for pincode, zone, charge, eta_days in rows:
+            key = (zone, charge, eta_days)
+            if key not in zone_ids:
+                zone_ids[key] = len(self.zones)
+                self.zones.append(Zone(zone, charge, eta_days))
+            entries[pincode] = zone_ids[key]
+        ordered = sorted(entries)
+        self.pincodes = array("I", ordered)
+        self.zone_of = array("H", (entries[p] for p in ordered))
+
+    def __len__(self):
+        return len(self.pincodes)
+
+    def lookup(self, pincode):
+        # Returns the Zone for a 6-digit pincode string, or None
+        if not is_valid_pincode(pincode):
+            return None
+        value = int(pincode)
+        i = bisect_left(self.pincodes, value)
+        if i < len(self.pincodes) and self.pincodes[i] == value:
+            return self.zones[self.zone_of[i]]
+        return None
+
+
+def is_valid_pincode(pincode):
+    # isdigit() alone also accepts digits like "²" that int() rejects
+    return len(pincode) == 6 and pincode.isascii() and pincode.isdecimal() and pincode[0] != "0"
+
+
+def load_zone_index(path):
+    rows = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            pincode = row["pincode"].strip()
+            if not is_valid_pincode(pincode):
+                continue
+            rows.append((int(pincode), row["zone"].strip(), int(row["charge"]), int(row["eta_days"])))
+    if not rows:
+        # An empty index would refuse every order; fail loudly instead
+        raise ValueError(f"{path} has no valid pincodes")
+    return ZoneIndex(rows)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_zone_index():
+    # None when DELIVERY_ZONES_FILE is not set: every pincode is then
+    # accepted without a delivery charge. A set but missing or empty file
+    # raises, so a typo does not quietly turn the delivery area off.
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = load_zone_index(ZONES_FILE) if ZONES_FILE else False
+    return None if _index is False else _index
@@ -0,0 +1,137 @@
+import argparse
+import csv
+import datetime
+import io
+import sys
+import tempfile
+import time
+from db import ORDER_COLUMNS, fetchall, get_product_by_name, order_filters
+from archive import ARCHIVE_ALIAS, list_archives, fetch_archive
+
+# ---------------- ORDER EXPORT ----------------
+# Orders are read in fixed-size chunks (keyset on id) and written as they
+# arrive, so memory stays bounded by CHUNK_SIZE whatever the table size.
+
+CHUNK_SIZE = 5000
+EXPORT_HEADER = [c.strip() for c in ORDER_COLUMNS.split(",")]
+
+
+def iter_order_chunks(chunk_size=CHUNK_SIZE, include_archive=True, **filters):
+    # Archived months first (oldest to newest), then the hot table
+    where, params = order_filters(**filters)
+    sources = []
+    if include_archive:
+        sources = [(path, f"{ARCHIVE_ALIAS}.orders")
+                   for _, path in reversed(list_archives(filters.get("date_from"), filters.get("date_to")))]
+    sources.append((None, "orders"))
+
+    for path, table in sources:
+        last_id = 0
+        while True:
+            chunk_where = where + (" AND " if where else " WHERE ") + "id > ?"
+            sql = f"SELECT {ORDER_COLUMNS} FROM {table}{chunk_where} ORDER BY id LIMIT ?"
+            chunk_params = params + [last_id, chunk_size]
+            # Archives are attached per chunk, so no reader is held between yields
+            rows = fetchall(sql, chunk_params) if path is None else fetch_archive(path, sql, chunk_params)
+            if not rows:
+                break
+            yield rows
+            last_id = rows[-1][0]
+
+
+def write_csv(out, chunk_size=CHUNK_SIZE, **filters):
+    # out is a binary file object; returns the number of rows written
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=True)
+    writer = csv.writer(text)
+    writer.writerow(EXPORT_HEADER)
+    count = 0
+    for rows in iter_order_chunks(chunk_size, **filters):
+        writer.writerows(rows)
+        count += len(rows)
+    text.flush()
+    text.detach()
+    return count
+
+
+def write_parquet(out, chunk_size=CHUNK_SIZE, **filters):
+    # Optional dependency: pyarrow is only needed for Parquet exports
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([
+        ("id", pa.int64()), ("customer_name", pa.string()), ("phone", pa.string()),
+        ("address", pa.string()), ("pincode", pa.string()), ("product", pa.string()),
+        ("quantity", pa.int64()), ("total_price", pa.int64()), ("payment_method", pa.string()),
+        ("upi_id", pa.string()), ("created_at", pa.string()), ("delivery_charge", pa.int64()),
+    ])
+    count = 0
+    with pq.ParquetWriter(out, schema) as writer:
+        # One row group per chunk
+        for rows in iter_order_chunks(chunk_size, **filters):
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema))
+            count += len(rows)
+    return count
+
+
+EXPORT_FORMATS = {
+    "csv": (write_csv, "text/csv"),
+    "parquet": (write_parquet, "application/vnd.apache.parquet"),
+}
+
+
+def export_orders(out, fmt="csv", **filters):
+    writer, _ = EXPORT_FORMATS[fmt]
+    return writer(out, **filters)
+
+
+def export_download(fmt="csv", **filters):
+    # For st.download_button, which needs the finished file as bytes. Rows
+    # are still read in chunks; the file is built in a temp file that only
+    # spills to disk once it is large, and read back once at the end.
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as out:
+        export_orders(out, fmt, **filters)
+        out.seek(0)
+        return out.read()
+
+
+# ---------------- COMMAND LINE ----------------
+# python export.py orders.csv --from 2026-01-01 --to 2026-01-31 --product "Pine Phenyl"
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export orders to CSV or Parquet")
+    parser.add_argument("output", help="output file, or - for stdout (CSV only)")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default=None,
+                        help="defaults to the output file extension, else csv")
+    parser.add_argument("--from", dest="date_from", type=datetime.date.fromisoformat)
+    parser.add_argument("--to", dest="date_to", type=datetime.date.fromisoformat)
+    parser.add_argument("--product", help="product name")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--no-archive", action="store_true", help="leave out archived orders")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("parquet" if args.output.endswith(".parquet") else "csv")
+    product_id = None
+    if args.product:
+        product = get_product_by_name(args.product)
+        if product is None:
+            parser.error(f"unknown product: {args.product}")
+        product_id = product[0]
+
+    filters = {"date_from": args.date_from, "date_to": args.date_to, "product_id": product_id,
+               "include_archive": not args.no_archive}
+    writer, _ = EXPORT_FORMATS[fmt]
+    start = time.perf_counter()
+    if args.output == "-":
+        count = writer(sys.stdout.buffer, args.chunk_size, **filters)
+    else:
+        with open(args.output, "wb") as out:
+            count = writer(out, args.chunk_size, **filters)
+    print(f"Exported {count} orders in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
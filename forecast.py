@@ -0,0 +1,255 @@
+import datetime
+import os
+import sys
+import threading
+import time
+import numpy as np
+from db import fetchall, get_products
+from perf import timed
+
+# ---------------- DEMAND FORECAST ----------------
+# Daily demand per product comes from the sale movements in the inventory
+# ledger, kept as one products x days matrix covering the last HISTORY_DAYS
+# days plus today. Forecasts, days of cover and reorder points are computed
+# for every product at once with array operations on that matrix.
+#
+# The matrix and the stock levels are loaded in one pass on first use; after
+# that each refresh reads only the movements after the last one seen (the
+# same id cursor as the incoming orders feed) and adds them in, and the
+# suggestions are only recomputed when something moved or the day changed.
+#
+#   python forecast.py
+
+HISTORY_DAYS = int(os.environ.get("PHENYL_FORECAST_HISTORY_DAYS", 56))
+HALF_LIFE_DAYS = 7  # weight of a day's demand halves every week back
+VARIABILITY_DAYS = 28  # days used for the demand standard deviation
+LEAD_TIME_DAYS = int(os.environ.get("PHENYL_REORDER_LEAD_DAYS", 7))  # supplier delivery time
+REVIEW_DAYS = int(os.environ.get("PHENYL_REORDER_REVIEW_DAYS", 7))  # time until the next reorder check
+SERVICE_Z = 1.65  # safety stock for ~95% of lead times without a stock-out
+
+STATUSES = ["Out of stock", "Reorder now", "Reorder soon", "OK", "No demand"]
+
+
+def _day_numbers(days):
+    # 'YYYY-MM-DD' strings -> days since the epoch, in one call
+    return np.array(days, dtype="datetime64[D]").astype(np.int64)
+
+
+class DemandHistory:
+
+    def __init__(self, history_days=HISTORY_DAYS):
+        self.history_days = history_days
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.last_movement_id = 0
+        self.today = None  # day number of the matrix's last column
+        self.product_ids = np.zeros(0, dtype=np.int64)
+        self.rows = {}  # product id -> matrix row
+        self.demand = np.zeros((0, history_days + 1), dtype=np.int64)
+        self.stock = np.zeros(0, dtype=np.int64)
+        self.first_day = np.zeros(0, dtype=np.int64)  # first ledger day per product
+        self.result = None
+        self.result_key = None
+
+    def _add_products(self, product_ids):
+        new = [pid for pid in dict.fromkeys(product_ids) if pid not in self.rows]
+        if not new:
+            return
+        for i, pid in enumerate(new, start=len(self.product_ids)):
+            self.rows[pid] = i
+        self.product_ids = np.concatenate([self.product_ids, np.array(new, dtype=np.int64)])
+        self.demand = np.vstack([self.demand, np.zeros((len(new), self.demand.shape[1]), dtype=np.int64)])
+        self.stock = np.concatenate([self.stock, np.zeros(len(new), dtype=np.int64)])
+        self.first_day = np.concatenate([self.first_day, np.full(len(new), np.iinfo(np.int64).max)])
+
+    def _row_index(self, product_ids):
+        return np.fromiter((self.rows[pid] for pid in product_ids), dtype=np.int64, count=len(product_ids))
+
+    def _shift_to(self, today):
+        # Drops the days that fell out of the window when the date changes
+        if self.today is not None and today > self.today:
+            shift = min(today - self.today, self.demand.shape[1])
+            self.demand = np.concatenate(
+                [self.demand[:, shift:], np.zeros((len(self.demand), shift), dtype=np.int64)], axis=1)
+        self.today = today
+
+    def _add_sales(self, product_ids, days, quantities):
+        if not len(product_ids):
+            return
+        columns = _day_numbers(days) - (self.today - self.history_days)
+        # Sales dated after today (clock skew, localtime vs UTC around
+        # midnight, hand-written ledger rows) count as today's demand
+        columns = np.minimum(columns, self.history_days)
+        keep = columns >= 0
+        np.add.at(self.demand, (self._row_index(product_ids)[keep], columns[keep]), np.asarray(quantities)[keep])
+
+    def _load(self, today):
+        # Stock and the movement cursor come from one statement, so they
+        # describe the same moment
+        stock = fetchall("""
+            SELECT ps.product_id, ps.stock, (SELECT COALESCE(MAX(id), 0) FROM stock_movements)
+            FROM product_stock ps
+        """)
+        self.last_movement_id = stock[0][2] if stock else 0
+        self._add_products([row[0] for row in stock])
+        self.stock[self._row_index([row[0] for row in stock])] = [row[1] for row in stock]
+
+        first = fetchall("""
+            SELECT product_id, MIN(substr(created_at, 1, 10)) FROM stock_movements
+            WHERE product_id IS NOT NULL GROUP BY product_id
+        """)
+        first = [row for row in first if row[0] in self.rows and row[1]]
+        if first:
+            self.first_day[self._row_index([row[0] for row in first])] = _day_numbers([row[1] for row in first])
+
+        self.today = today
+        since = datetime.date.fromordinal(datetime.date(1970, 1, 1).toordinal() + today - self.history_days)
+        sales = fetchall("""
+            SELECT product_id, substr(created_at, 1, 10), -quantity FROM stock_movements
+            WHERE kind = 'sale' AND product_id IS NOT NULL AND id <= ? AND created_at >= ?
+        """, (self.last_movement_id, since.isoformat()))
+        sales = [row for row in sales if row[0] in self.rows]
+        self._add_sales([row[0] for row in sales], [row[1] for row in sales], [row[2] for row in sales])
+        self.loaded = True
+
+    def _catch_up(self):
+        # Every movement after the cursor: all of them change stock, sales
+        # also add demand
+        moves = fetchall("""
+            SELECT id, product_id, kind, quantity, substr(created_at, 1, 10) FROM stock_movements
+            WHERE id > ? AND product_id IS NOT NULL ORDER BY id
+        """, (self.last_movement_id,))
+        if not moves:
+            return
+        self.last_movement_id = moves[-1][0]
+        self._add_products([m[1] for m in moves])
+        rows = self._row_index([m[1] for m in moves])
+        np.add.at(self.stock, rows, [m[3] for m in moves])
+        days = _day_numbers([m[4] for m in moves])
+        np.minimum.at(self.first_day, rows, days)
+        sales = [m for m in moves if m[2] == "sale"]
+        self._add_sales([m[1] for m in sales], [m[4] for m in sales], [-m[3] for m in sales])
+
+    @timed("forecast.refresh")
+    def refresh(self):
+        today = int(_day_numbers([datetime.date.today().isoformat()])[0])
+        if not self.loaded:
+            self._load(today)
+        else:
+            self._shift_to(today)
+            self._catch_up()
+
+    def suggestions(self):
+        # Returns the cached result unless stock moved, the day changed or
+        # the catalog changed since it was computed
+        with self.lock:
+            self.refresh()
+            products = get_products()
+            key = (self.last_movement_id, self.today, tuple((p[0], p[1]) for p in products))
+            if key != self.result_key:
+                self.result = compute_suggestions(self, products)
+                self.result_key = key
+            return self.result
+
+
+# ---------------- SUGGESTIONS ----------------
+@timed("forecast.compute")
+def compute_suggestions(history, products):
+    # One row per catalog product, most urgent first:
+    # (id, name, stock, last 7 days/day, forecast/day, days of cover,
+    #  reorder point, suggested order, status)
+    if not products:
+        return []
+    ids = np.array([p[0] for p in products], dtype=np.int64)
+    known = np.array([pid in history.rows for pid in ids])
+    rows = np.zeros(len(ids), dtype=np.int64)
+    rows[known] = history._row_index(ids[known])
+
+    # Complete days only: today's partial demand would drag the rates down
+    demand = history.demand[rows][:, :-1].astype(float)
+    demand[~known] = 0
+    stock = np.where(known, history.stock[rows], 0)
+    days = demand.shape[1]
+
+    # Days before a product's first ledger entry are not counted as zero demand
+    first_column = np.where(known, history.first_day[rows], history.today) - (history.today - history.history_days)
+    active = np.arange(days)[None, :] >= first_column[:, None]
+
+    # Exponentially weighted daily demand, newest day weighted most
+    weights = 0.5 ** (np.arange(days)[::-1] / HALF_LIFE_DAYS)
+    active_weight = active @ weights
+    forecast = np.divide((demand * active) @ weights, active_weight,
+                         out=np.zeros(len(ids)), where=active_weight > 0)
+
+    recent = demand[:, -7:]
+    recent_days = active[:, -7:].sum(axis=1)
+    last_week = np.divide(recent.sum(axis=1), recent_days, out=np.zeros(len(ids)), where=recent_days > 0)
+
+    window = demand[:, -VARIABILITY_DAYS:]
+    window_active = active[:, -VARIABILITY_DAYS:]
+    n = window_active.sum(axis=1)
+    mean = np.divide(window.sum(axis=1), n, out=np.zeros(len(ids)), where=n > 0)
+    variance = np.divide((((window - mean[:, None]) ** 2) * window_active).sum(axis=1), n,
+                         out=np.zeros(len(ids)), where=n > 0)
+
+    safety_stock = SERVICE_Z * np.sqrt(variance) * np.sqrt(LEAD_TIME_DAYS)
+    reorder_point = np.ceil(forecast * LEAD_TIME_DAYS + safety_stock)
+    order_up_to = reorder_point + np.ceil(forecast * REVIEW_DAYS)
+    suggested = np.where(stock <= reorder_point, np.maximum(order_up_to - stock, 0), 0)
+    cover = np.divide(stock, forecast, out=np.full(len(ids), np.inf), where=forecast > 0)
+
+    status = np.select(
+        [stock <= 0, forecast == 0, stock <= reorder_point, cover <= LEAD_TIME_DAYS + REVIEW_DAYS],
+        [0, 4, 1, 2], default=3)
+    order = np.lexsort((-forecast, cover, status))
+
+    names = [p[1] for p in products]
+    return [(int(ids[i]), names[i], int(stock[i]), round(float(last_week[i]), 1), round(float(forecast[i]), 1),
+             None if np.isinf(cover[i]) else round(float(cover[i]), 1),
+             int(reorder_point[i]), int(suggested[i]), STATUSES[status[i]]) for i in order]
+
+
+def rolling_demand(product_id, days=7):
+    # [(day, average daily demand over the `days` days ending that day)]
+    # for one product across the history window
+    history = get_demand_history()
+    with history.lock:
+        row = history.rows.get(product_id)
+        if row is None or history.today is None:
+            return []
+        sums = np.cumsum(np.concatenate([[0], history.demand[row, :-1]]))
+        averages = (sums[days:] - sums[:-days]) / days
+        first = history.today - history.history_days + days - 1
+    return [(str(np.datetime64(first + i, "D")), round(float(a), 2)) for i, a in enumerate(averages)]
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_demand_history():
+    global _history
+    if _history is None:
+        with _history_lock:
+            if _history is None:
+                _history = DemandHistory()
+    return _history
+
+
+def reorder_suggestions():
+    return get_demand_history().suggestions()
+
+
+# ---------------- COMMAND LINE ----------------
+# python forecast.py
+if __name__ == "__main__":
+    if sys.argv[1:]:
+        print("Usage: python forecast.py")
+        sys.exit(1)
+    start = time.perf_counter()
+    rows = reorder_suggestions()
+    for _, name, stock, _, daily, cover, point, suggested, status in rows:
+        cover = "-" if cover is None else f"{cover:.1f}d"
+        print(f"{status:<13} {name[:30]:<30} stock {stock:>6}  {daily:>7.1f}/day  cover {cover:>8}  "
+              f"reorder at {point:>6}  order {suggested:>6}")
+    print(f"{len(rows)} products in {time.perf_counter() - start:.2f}s", file=sys.stderr)
@@ -0,0 +1,461 @@
+import argparse
+import datetime
+import html
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import zipfile
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+from db import ORDER_COLUMNS, fetchall
+from delivery import is_valid_pincode
+from perf import timed
+from qr import generate_qr
+
+# ---------------- INVOICES ----------------
+# One document per order: a GST tax invoice followed by a delivery slip,
+# both with the UPI QR for the order amount. HTML needs nothing extra; PDF
+# is written directly (standard Helvetica, so Latin text only).
+#
+#   python invoices.py order 123 --format pdf
+#   python invoices.py day 2026-10-17 --format pdf --workers 4
+#
+# Day mode reads the day's orders in chunks and renders them across a
+# process pool, writing each invoice into the zip as soon as it is done.
+# At most MAX_IN_FLIGHT_PER_WORKER tasks of TASK_SIZE invoices per worker
+# are pending at once, so memory does not grow with the number of orders.
+
+SHOP_NAME = "TAMILAN CHEMICALS"
+SHOP_ADDRESS = "No 11B Periyar Salai, Rajiv Gandhi Nagar, Alapakkam, Chennai - 600116"
+SHOP_PHONE = "+91 74488666665 / 9514133444"
+SHOP_EMAIL = "tamilanchemicals@gmail.com"
+SHOP_UPI_ID = "divakardiva1011@oksbi"
+SHOP_GSTIN = os.environ.get("PHENYL_SHOP_GSTIN", "")
+SHOP_STATE_PINCODES = range(60, 67)  # Tamil Nadu: 600000-669999
+
+HSN_CODE = "3808"  # disinfectants
+GST_RATE = 18  # percent; prices are GST inclusive
+INVOICE_PREFIX = "TC"
+
+CHUNK_SIZE = 500
+DAY_ZIP_DIR = os.path.join(tempfile.gettempdir(), "phenyl_shop_invoices")
+DAY_ZIP_MAX_AGE = 24 * 3600  # seconds an unrendered-again day zip is kept
+TASK_SIZE = 25  # invoices per pool task
+MAX_IN_FLIGHT_PER_WORKER = 4  # tasks
+
+
+def invoice_number(order):
+    return f"{INVOICE_PREFIX}/{(order[10] or '')[:4] or 'NA'}/{order[0]:06d}"
+
+
+def amount_due(order):
+    # total_price is the products only; delivery is charged on top
+    return (order[7] or 0) + (order[11] or 0)
+
+
+def upi_link(order):
+    # Exactly the checkout link: it only varies with the amount, so
+    # generate_qr's cache is shared by every invoice for the same total
+    return f"upi://pay?pa={SHOP_UPI_ID}&pn=TAMILAN%20CHEMICALS&am={amount_due(order)}&cu=INR"
+
+
+def tax_lines(order):
+    # (taxable value, [(label, amount)]); CGST + SGST within Tamil Nadu, else IGST
+    total = amount_due(order)
+    taxable = round(total * 100 / (100 + GST_RATE), 2)
+    tax = round(total - taxable, 2)
+    pincode = (order[4] or "").strip()
+    if is_valid_pincode(pincode) and int(pincode[:2]) in SHOP_STATE_PINCODES:
+        half = round(tax / 2, 2)
+        return taxable, [(f"CGST @ {GST_RATE / 2:g}%", half), (f"SGST @ {GST_RATE / 2:g}%", round(tax - half, 2))]
+    return taxable, [(f"IGST @ {GST_RATE}%", tax)]
+
+
+def _payment_status(order):
+    # Orders carry no payment confirmation, so a UPI order is never shown as paid
+    if order[8] == "UPI Payment":
+        return f"UPI ({order[9] or SHOP_UPI_ID}): Rs. {amount_due(order)} due"
+    return f"{order[8] or 'Cash On Delivery'}: collect Rs. {amount_due(order)} on delivery"
+
+
+# ---------------- HTML ----------------
+_HTML_STYLE = """
+body { font-family: Arial, Helvetica, sans-serif; color: #222; margin: 0; }
+.page { width: 180mm; margin: 10mm auto; }
+.slip { page-break-before: always; border-top: 2px dashed #999; padding-top: 8mm; }
+h1 { font-size: 20px; margin: 0; color: #2c5d4f; }
+h2 { font-size: 16px; margin: 12px 0 6px; }
+table { width: 100%; border-collapse: collapse; font-size: 13px; }
+th, td { border: 1px solid #ccc; padding: 6px; text-align: left; }
+td.num, th.num { text-align: right; }
+.muted { color: #666; font-size: 12px; }
+.qr { width: 38mm; float: right; text-align: center; font-size: 11px; }
+.qr svg { width: 36mm; height: 36mm; }
+"""
+
+
+def _escape(value):
+    return html.escape(str(value if value is not None else ""))
+
+
+def render_html(order):
+    e = _escape
+    taxable, taxes = tax_lines(order)
+    quantity = order[6] or 0
+    rate = round(order[7] / quantity, 2) if quantity else order[7]
+    qr = generate_qr(upi_link(order), "svg")
+    delivery_row = (f'<tr><td>Delivery charge</td><td></td><td></td><td></td><td class="num">{e(order[11])}</td></tr>'
+                    if order[11] else "")
+    tax_rows = "".join(f'<tr><td colspan="4" class="num">{label}</td><td class="num">{amount:.2f}</td></tr>'
+                       for label, amount in taxes)
+    gstin = f"<div>GSTIN: {e(SHOP_GSTIN)}</div>" if SHOP_GSTIN else ""
+    qr_box = f'<div class="qr">{qr}<div>Scan to pay Rs. {e(amount_due(order))} by UPI</div></div>'
+    customer = f"""
+        <div><b>{e(order[1])}</b></div>
+        <div>{e(order[3])}</div>
+        <div>Pincode {e(order[4])} &middot; {e(order[2])}</div>"""
+
+    document = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Invoice {e(invoice_number(order))}</title>
+<style>{_HTML_STYLE}</style></head><body>
+<div class="page">
+    {qr_box}
+    <h1>{SHOP_NAME}</h1>
+    <div class="muted">{SHOP_ADDRESS}<br>{SHOP_PHONE} &middot; {SHOP_EMAIL}</div>
+    {gstin}
+    <h2>Tax Invoice</h2>
+    <div>Invoice No: <b>{e(invoice_number(order))}</b> &middot; Date: {e(order[10] or "")}</div>
+    <h2>Bill To</h2>
+    {customer}
+    <h2>Items</h2>
+    <table>
+        <tr><th>Item</th><th>HSN</th><th class="num">Qty (L)</th><th class="num">Rate (Rs.)</th><th class="num">Amount (Rs.)</th></tr>
+        <tr><td>{e(order[5])}</td><td>{HSN_CODE}</td><td class="num">{e(quantity)}</td><td class="num">{rate}</td><td class="num">{e(order[7])}</td></tr>
+        {delivery_row}
+        <tr><td colspan="4" class="num">Taxable value</td><td class="num">{taxable:.2f}</td></tr>
+        {tax_rows}
+        <tr><th colspan="4" class="num">Total (GST inclusive)</th><th class="num">{e(amount_due(order))}</th></tr>
+    </table>
+    <p>Payment: {e(_payment_status(order))}</p>
+    <p class="muted">This is a computer generated invoice.</p>
+</div>
+<div class="page slip">
+    {qr_box}
+    <h1>Delivery Slip</h1>
+    <div>Order #{e(order[0])} &middot; {e(order[10] or "")}</div>
+    <h2>Deliver To</h2>
+    {customer}
+    <h2>Package</h2>
+    <div>{e(order[5])} &times; {e(quantity)} L</div>
+    <p><b>{e(_payment_status(order))}</b></p>
+    <p>Received by: ____________________ &nbsp; Date: ____________</p>
+</div>
+</body></html>
+"""
+    return document.encode("utf-8")
+
+
+# ---------------- PDF ----------------
+# Just enough PDF for these two pages: Helvetica text (WinAnsi, so no
+# Indic scripts; use HTML for those), lines, and the QR as a 1-bit image.
+
+A4 = (595, 842)
+
+
+def _pdf_text(value):
+    text = str(value if value is not None else "").encode("cp1252", errors="replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+class _PdfPage:
+
+    def __init__(self):
+        self.ops = []
+
+    def text(self, x, y, value, size=10, bold=False):
+        self.ops.append(f"BT /{'F2' if bold else 'F1'} {size} Tf {x} {y} Td ({_pdf_text(value)}) Tj ET")
+
+    def line(self, x1, y1, x2, y2):
+        self.ops.append(f"{x1} {y1} m {x2} {y2} l S")
+
+    def image(self, name, x, y, size):
+        self.ops.append(f"q {size} 0 0 {size} {x} {y} cm /{name} Do Q")
+
+
+def _pdf_document(pages, images):
+    # pages: [_PdfPage]; images: {name: (width, height, 1-bit rows, 0 = black)}
+    objects = [
+        None,  # 1: catalog, filled in below
+        None,  # 2: page tree
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    xobjects = []
+    for name, (width, height, pixels) in images.items():
+        data = zlib.compress(pixels)
+        objects.append(b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray "
+                       b"/BitsPerComponent 1 /Filter /FlateDecode /Length %d >>\nstream\n" % (width, height, len(data))
+                       + data + b"\nendstream")
+        xobjects.append(f"/{name} {len(objects)} 0 R")
+    resources = f"<< /Font << /F1 3 0 R /F2 4 0 R >> /XObject << {' '.join(xobjects)} >> >>"
+
+    kids = []
+    for page in pages:
+        content = zlib.compress("\n".join(page.ops).encode("latin-1"))
+        objects.append(b"<< /Filter /FlateDecode /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {A4[0]} {A4[1]}] "
+                       f"/Resources {resources} /Contents {len(objects)} 0 R >>".encode())
+        kids.append(f"{len(objects)} 0 R")
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    out.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+@lru_cache(maxsize=1024)
+def _qr_bits(link):
+    from PIL import Image
+    with Image.open(io.BytesIO(generate_qr(link, "png"))) as img:
+        bits = img.convert("1")
+        return bits.width, bits.height, bits.tobytes()
+
+
+def _qr_image(order):
+    return _qr_bits(upi_link(order))
+
+
+def _pdf_header(page, title):
+    top = A4[1] - 50
+    page.text(40, top, SHOP_NAME, 18, bold=True)
+    page.text(40, top - 16, SHOP_ADDRESS, 9)
+    page.text(40, top - 28, f"{SHOP_PHONE}  |  {SHOP_EMAIL}", 9)
+    if SHOP_GSTIN:
+        page.text(40, top - 40, f"GSTIN: {SHOP_GSTIN}", 9)
+    page.text(40, top - 66, title, 14, bold=True)
+    page.image("QR", A4[0] - 150, top - 100, 110)
+    page.text(A4[0] - 150, top - 112, "Scan to pay by UPI", 8)
+    return top - 90
+
+
+def _pdf_customer(page, order, y, heading):
+    page.text(40, y, heading, 11, bold=True)
+    page.text(40, y - 16, order[1], 10, bold=True)
+    page.text(40, y - 30, order[3], 10)
+    page.text(40, y - 44, f"Pincode {order[4] or ''}  |  {order[2] or ''}", 10)
+    return y - 70
+
+
+def render_pdf(order):
+    taxable, taxes = tax_lines(order)
+    quantity = order[6] or 0
+    rate = round(order[7] / quantity, 2) if quantity else order[7]
+
+    invoice = _PdfPage()
+    y = _pdf_header(invoice, "Tax Invoice")
+    invoice.text(40, y, f"Invoice No: {invoice_number(order)}    Date: {order[10] or ''}", 10)
+    y = _pdf_customer(invoice, order, y - 30, "Bill To")
+
+    columns = [(40, "Item"), (260, "HSN"), (320, "Qty (L)"), (390, "Rate (Rs.)"), (480, "Amount (Rs.)")]
+    invoice.line(40, y + 14, A4[0] - 40, y + 14)
+    for x, label in columns:
+        invoice.text(x, y, label, 10, bold=True)
+    invoice.line(40, y - 6, A4[0] - 40, y - 6)
+    y -= 22
+    for (x, _), value in zip(columns, [order[5], HSN_CODE, quantity, rate, order[7]]):
+        invoice.text(x, y, value, 10)
+    y -= 22
+    if order[11]:
+        invoice.text(40, y, "Delivery charge", 10)
+        invoice.text(480, y, order[11], 10)
+        y -= 22
+    for label, amount in [("Taxable value", taxable)] + taxes:
+        invoice.text(320, y, label, 10)
+        invoice.text(480, y, f"{amount:.2f}", 10)
+        y -= 16
+    invoice.line(320, y + 10, A4[0] - 40, y + 10)
+    invoice.text(320, y - 4, "Total (GST inclusive)", 11, bold=True)
+    invoice.text(480, y - 4, amount_due(order), 11, bold=True)
+    invoice.text(40, y - 40, f"Payment: {_payment_status(order)}", 10)
+    invoice.text(40, y - 56, "This is a computer generated invoice.", 8)
+
+    slip = _PdfPage()
+    y = _pdf_header(slip, "Delivery Slip")
+    slip.text(40, y, f"Order #{order[0]}    {order[10] or ''}", 10)
+    y = _pdf_customer(slip, order, y - 30, "Deliver To")
+    slip.text(40, y, "Package", 11, bold=True)
+    slip.text(40, y - 16, f"{order[5]} x {quantity} L", 10)
+    slip.text(40, y - 44, _payment_status(order), 11, bold=True)
+    slip.text(40, y - 90, "Received by: ______________________     Date: ______________", 10)
+
+    return _pdf_document([invoice, slip], {"QR": _qr_image(order)})
+
+
+FORMATS = {
+    "html": (render_html, "text/html"),
+    "pdf": (render_pdf, "application/pdf"),
+}
+
+
+def invoice_filename(order, fmt):
+    return f"invoice-{order[0]:06d}.{fmt}"
+
+
+def render_invoice(order, fmt="html"):
+    renderer, _ = FORMATS[fmt]
+    return renderer(order)
+
+
+def _render_for_zip(orders, fmt):
+    # Runs in a pool worker: order rows go in, finished files come out,
+    # so workers never open the database
+    return [(invoice_filename(order, fmt), render_invoice(order, fmt)) for order in orders]
+
+
+# ---------------- ORDERS ----------------
+def get_invoice_order(order_id):
+    rows = fetchall(f"SELECT {ORDER_COLUMNS} FROM orders WHERE id = ?", (order_id,))
+    return rows[0] if rows else None
+
+
+def iter_day_orders(day, chunk_size=CHUNK_SIZE):
+    # Keyset chunks of one day's orders, oldest first
+    last_id = 0
+    while True:
+        rows = fetchall(f"""
+            SELECT {ORDER_COLUMNS} FROM orders
+            WHERE created_at >= ? AND created_at < date(?, '+1 day') AND id > ?
+            ORDER BY id LIMIT ?
+        """, (day.isoformat(), day.isoformat(), last_id, chunk_size))
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
+
+
+# ---------------- DAY BATCH ----------------
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@timed("invoices.render_day")
+def render_day(day, out, fmt="pdf", workers=None):
+    # Writes a zip of every invoice for day to the binary file object out.
+    # Returns {"invoices", "seconds", "invoices_per_second", "workers"}.
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    count = 0
+
+    def write(files):
+        nonlocal count
+        for name, data in files:
+            archive.writestr(name, data)
+        count += len(files)
+
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as archive:
+        if workers == 1:
+            for orders in _batched(iter_day_orders(day), TASK_SIZE):
+                write(_render_for_zip(orders, fmt))
+        else:
+            # spawn, as in benchmark.py: forking a threaded Streamlit server is unsafe
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                pending = set()
+                for orders in _batched(iter_day_orders(day), TASK_SIZE):
+                    if len(pending) >= workers * MAX_IN_FLIGHT_PER_WORKER:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            write(future.result())
+                    pending.add(pool.submit(_render_for_zip, orders, fmt))
+                for future in wait(pending).done:
+                    write(future.result())
+    seconds = time.perf_counter() - start
+    return {"invoices": count, "seconds": round(seconds, 3),
+            "invoices_per_second": round(count / seconds, 1) if seconds else None, "workers": workers}
+
+
+def render_day_file(day, fmt="pdf", workers=None):
+    # (path, stats) for the admin page: the zip goes to a temp file, so a
+    # session keeps only its path between reruns, not the bytes. Zips older
+    # than DAY_ZIP_MAX_AGE (abandoned sessions) are removed on each call.
+    os.makedirs(DAY_ZIP_DIR, exist_ok=True)
+    cutoff = time.time() - DAY_ZIP_MAX_AGE
+    for entry in os.scandir(DAY_ZIP_DIR):
+        if entry.name.endswith(".zip") and entry.stat().st_mtime < cutoff:
+            remove_day_file(entry.path)
+    fd, path = tempfile.mkstemp(prefix=f"invoices-{day.isoformat()}-", suffix=".zip", dir=DAY_ZIP_DIR)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            stats = render_day(day, out, fmt, workers)
+    except BaseException:
+        remove_day_file(path)
+        raise
+    return path, stats
+
+
+def read_day_file(path):
+    # Called by st.download_button only when the download is clicked
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def remove_day_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# ---------------- COMMAND LINE ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render order invoices")
+    sub = parser.add_subparsers(dest="command", required=True)
+    one = sub.add_parser("order", help="one order's invoice")
+    one.add_argument("order_id", type=int)
+    one.add_argument("--format", choices=list(FORMATS), default="pdf")
+    one.add_argument("-o", "--output", help="default: invoice-<id>.<format>")
+    day = sub.add_parser("day", help="zip of every invoice for a day")
+    day.add_argument("day", type=datetime.date.fromisoformat, nargs="?", default=datetime.date.today())
+    day.add_argument("--format", choices=list(FORMATS), default="pdf")
+    day.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    day.add_argument("-o", "--output", help="default: invoices-<day>.zip")
+    args = parser.parse_args(argv)
+
+    if args.command == "order":
+        order = get_invoice_order(args.order_id)
+        if order is None:
+            parser.error(f"no order {args.order_id}")
+        path = args.output or invoice_filename(order, args.format)
+        with open(path, "wb") as f:
+            f.write(render_invoice(order, args.format))
+        print(f"Wrote {path}", file=sys.stderr)
+        return
+
+    path = args.output or f"invoices-{args.day.isoformat()}.zip"
+    with open(path, "wb") as out:
+        stats = render_day(args.day, out, args.format, args.workers)
+    print(f"Rendered {stats['invoices']} invoices in {stats['seconds']:.2f}s "
+          f"({stats['invoices_per_second']} invoices/s, {stats['workers']} workers) -> {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
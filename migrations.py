@@ -0,0 +1,355 @@
+# ---------------- SCHEMA MIGRATIONS ----------------
+# Each step moves the database from version N-1 to N (PRAGMA user_version).
+# Steps run once per process, when the connection pool is created, each in
+# its own transaction together with the version bump. Add new steps at the
+# end of MIGRATIONS; never edit a step that has already shipped.
+
+DEFAULT_PRODUCTS = [
+    ("Lemon Phenyl", 80, 50),
+    ("Pine Phenyl", 90, 40),
+    ("Rose Phenyl", 85, 30),
+    ("Lavender Phenyl", 100, 20),
+]
+
+
+def _create_base_tables(conn):
+    # IF NOT EXISTS: databases created before versioning already have these
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS products(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        price INTEGER,
+        stock INTEGER
+    )
+    """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS orders(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        customer_name TEXT,
+        phone TEXT,
+        address TEXT,
+        pincode TEXT,
+        product TEXT,
+        quantity INTEGER,
+        total_price INTEGER,
+        payment_method TEXT,
+        upi_id TEXT
+    )
+    """)
+
+
+def _seed_default_products(conn):
+    # Only an empty catalog is seeded, so existing shops keep their products
+    if conn.execute("SELECT COUNT(*) FROM products").fetchone()[0] == 0:
+        conn.executemany("INSERT INTO products(name, price, stock) VALUES(?,?,?)", DEFAULT_PRODUCTS)
+
+
+def _normalize_orders(conn):
+    # orders gets a product_id foreign key and a created_at timestamp.
+    # SQLite cannot add either with ALTER TABLE, so the table is rebuilt.
+    # product keeps the name as it was when the order was placed.
+    conn.execute("""
+    CREATE TABLE orders_new(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        customer_name TEXT,
+        phone TEXT,
+        address TEXT,
+        pincode TEXT,
+        product_id INTEGER REFERENCES products(id) ON DELETE SET NULL,
+        product TEXT,
+        quantity INTEGER,
+        total_price INTEGER,
+        payment_method TEXT,
+        upi_id TEXT,
+        created_at TEXT DEFAULT (datetime('now', 'localtime'))
+    )
+    """)
+
+    # Existing orders have no timestamp; created_at stays NULL for them
+    conn.execute("""
+    INSERT INTO orders_new(id, customer_name, phone, address, pincode, product_id, product,
+                           quantity, total_price, payment_method, upi_id, created_at)
+    SELECT o.id, o.customer_name, o.phone, o.address, o.pincode,
+           (SELECT MIN(p.id) FROM products p WHERE p.name = o.product), o.product,
+           o.quantity, o.total_price, o.payment_method, o.upi_id, NULL
+    FROM orders o
+    """)
+    conn.execute("DROP TABLE orders")
+    conn.execute("ALTER TABLE orders_new RENAME TO orders")
+
+    # Duplicate product names get the id appended before names become unique.
+    # A real product may already be called "<name> #<id>", so the new name
+    # is checked against every name and a counter added until it is free.
+    taken = {row[0] for row in conn.execute("SELECT name FROM products")}
+    duplicates = conn.execute("""
+    SELECT id, name FROM products
+    WHERE name IS NOT NULL AND id NOT IN (SELECT MIN(id) FROM products GROUP BY name)
+    ORDER BY id
+    """).fetchall()
+    for product_id, name in duplicates:
+        new_name = f"{name} #{product_id}"
+        n = 2
+        while new_name in taken:
+            new_name = f"{name} #{product_id} ({n})"
+            n += 1
+        taken.add(new_name)
+        conn.execute("UPDATE products SET name = ? WHERE id = ?", (new_name, product_id))
+
+    conn.execute("CREATE UNIQUE INDEX idx_products_name ON products(name)")
+    conn.execute("CREATE INDEX idx_orders_created_at ON orders(created_at)")
+    conn.execute("CREATE INDEX idx_orders_phone ON orders(phone)")
+    conn.execute("CREATE INDEX idx_orders_product_id ON orders(product_id)")
+
+
+def _create_sales_summaries(conn):
+    # Aggregates kept up to date by db.place_order in the order transaction.
+    # Products are keyed by the name the order was placed under.
+    # analytics.rebuild_sales_summary() backfills them from orders.
+    conn.execute("""
+    CREATE TABLE sales_daily(
+        day TEXT PRIMARY KEY,
+        orders INTEGER NOT NULL DEFAULT 0,
+        litres INTEGER NOT NULL DEFAULT 0,
+        revenue INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+
+    conn.execute("""
+    CREATE TABLE sales_product_daily(
+        day TEXT NOT NULL,
+        product TEXT NOT NULL,
+        orders INTEGER NOT NULL DEFAULT 0,
+        litres INTEGER NOT NULL DEFAULT 0,
+        revenue INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY(day, product)
+    )
+    """)
+
+    conn.execute("""
+    CREATE TABLE sales_payment_daily(
+        day TEXT NOT NULL,
+        payment_method TEXT NOT NULL,
+        orders INTEGER NOT NULL DEFAULT 0,
+        revenue INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY(day, payment_method)
+    )
+    """)
+
+
+def _create_outbox(conn):
+    # Notifications written in the order transaction, delivered later by
+    # notify.py. next_attempt_at and claimed_at are unix timestamps.
+    conn.execute("""
+    CREATE TABLE outbox(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        order_id INTEGER REFERENCES orders(id) ON DELETE SET NULL,
+        kind TEXT NOT NULL,
+        recipient TEXT,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0),
+        claimed_at REAL,
+        last_error TEXT,
+        created_at TEXT DEFAULT (datetime('now', 'localtime'))
+    )
+    """)
+    conn.execute("CREATE INDEX idx_outbox_due ON outbox(status, next_attempt_at)")
+
+
+def _create_product_search(conn):
+    # products_fts: word/prefix search over name and description.
+    # products_trigram: character trigrams of the name, used to find
+    # near matches when a search word is misspelt.
+    # Both are external-content tables kept in sync by triggers.
+    conn.execute("ALTER TABLE products ADD COLUMN description TEXT")
+
+    conn.execute("""
+    CREATE VIRTUAL TABLE products_fts USING fts5(
+        name, description,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+    )
+    """)
+    conn.execute("""
+    CREATE VIRTUAL TABLE products_trigram USING fts5(
+        name,
+        content='products', content_rowid='id',
+        tokenize='trigram'
+    )
+    """)
+
+    conn.execute("""
+    CREATE TRIGGER products_search_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+        INSERT INTO products_trigram(rowid, name) VALUES (new.id, new.name);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER products_search_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO products_trigram(products_trigram, rowid, name) VALUES ('delete', old.id, old.name);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER products_search_au AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO products_trigram(products_trigram, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+        INSERT INTO products_trigram(rowid, name) VALUES (new.id, new.name);
+    END
+    """)
+
+    conn.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO products_trigram(products_trigram) VALUES ('rebuild')")
+
+
+def _create_api_batches(conn):
+    # Accepted batch orders by idempotency key, written in the same
+    # transaction as the orders, so a retried request is answered from here
+    conn.execute("""
+    CREATE TABLE api_batches(
+        idempotency_key TEXT PRIMARY KEY,
+        request_hash TEXT NOT NULL,
+        response TEXT NOT NULL,
+        created_at TEXT DEFAULT (datetime('now', 'localtime'))
+    )
+    """)
+
+
+def _create_inventory_ledger(conn):
+    # stock_movements is the append-only record of every stock change
+    # (quantity is signed). stock_snapshots holds each product's stock as of
+    # movement_id; current stock is the snapshot plus the movements after it
+    # (the product_stock view). db.py folds the tail into the snapshots every
+    # STOCK_COMPACT_EVERY movements. products.stock is replaced by the ledger.
+    conn.execute("""
+    CREATE TABLE stock_movements(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER REFERENCES products(id) ON DELETE SET NULL,
+        kind TEXT NOT NULL,
+        quantity INTEGER NOT NULL,
+        order_id INTEGER REFERENCES orders(id) ON DELETE SET NULL,
+        note TEXT,
+        created_at TEXT DEFAULT (datetime('now', 'localtime'))
+    )
+    """)
+    conn.execute("CREATE INDEX idx_stock_movements_product ON stock_movements(product_id, id)")
+    conn.execute("CREATE INDEX idx_stock_movements_order ON stock_movements(order_id)")
+
+    conn.execute("""
+    CREATE TABLE stock_snapshots(
+        product_id INTEGER PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,
+        stock INTEGER NOT NULL,
+        movement_id INTEGER NOT NULL,
+        taken_at TEXT DEFAULT (datetime('now', 'localtime'))
+    )
+    """)
+
+    # Existing stock becomes each product's opening movement
+    conn.execute("""
+    INSERT INTO stock_movements(product_id, kind, quantity, note)
+    SELECT id, 'opening', COALESCE(stock, 0), 'Stock before the inventory ledger' FROM products ORDER BY id
+    """)
+    conn.execute("""
+    INSERT INTO stock_snapshots(product_id, stock, movement_id)
+    SELECT product_id, quantity, id FROM stock_movements
+    """)
+
+    conn.execute("""
+    CREATE TRIGGER products_stock_ai AFTER INSERT ON products BEGIN
+        INSERT INTO stock_snapshots(product_id, stock, movement_id) VALUES (new.id, 0, 0);
+    END
+    """)
+    conn.execute("""
+    CREATE VIEW product_stock AS
+    SELECT s.product_id,
+           s.stock + COALESCE((SELECT SUM(m.quantity) FROM stock_movements m
+                               WHERE m.product_id = s.product_id AND m.id > s.movement_id), 0) AS stock
+    FROM stock_snapshots s
+    """)
+    conn.execute("ALTER TABLE products DROP COLUMN stock")
+
+
+def _add_order_delivery_charge(conn):
+    # Delivery is kept apart from total_price, which stays product revenue.
+    # Orders placed before this step keep any charge inside total_price.
+    conn.execute("ALTER TABLE orders ADD COLUMN delivery_charge INTEGER NOT NULL DEFAULT 0")
+
+
+def _index_order_pincode(conn):
+    # Lets the admin phone/pincode search run as two index range scans
+    conn.execute("CREATE INDEX idx_orders_pincode ON orders(pincode)")
+
+
+def _unlink_stock_movements(conn):
+    # The ledger is append-only, but ON DELETE SET NULL rewrote its order_id
+    # whenever archive.py moved orders out (and product_id when a product
+    # was deleted). Both become plain ids: archived orders keep their ids,
+    # and product ids are never reused. SQLite cannot drop a foreign key
+    # with ALTER TABLE, so the table is rebuilt.
+    conn.execute("""
+    CREATE TABLE stock_movements_new(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER,
+        kind TEXT NOT NULL,
+        quantity INTEGER NOT NULL,
+        order_id INTEGER,
+        note TEXT,
+        created_at TEXT DEFAULT (datetime('now', 'localtime'))
+    )
+    """)
+    conn.execute("""
+    INSERT INTO stock_movements_new(id, product_id, kind, quantity, order_id, note, created_at)
+    SELECT id, product_id, kind, quantity, order_id, note, created_at FROM stock_movements
+    """)
+    # product_stock reads stock_movements, so it is recreated around the swap
+    view = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'view' AND name = 'product_stock'").fetchone()[0]
+    conn.execute("DROP VIEW product_stock")
+    conn.execute("DROP TABLE stock_movements")
+    conn.execute("ALTER TABLE stock_movements_new RENAME TO stock_movements")
+    conn.execute(view)
+    conn.execute("CREATE INDEX idx_stock_movements_product ON stock_movements(product_id, id)")
+    conn.execute("CREATE INDEX idx_stock_movements_order ON stock_movements(order_id)")
+
+
+MIGRATIONS = [
+    _create_base_tables,
+    _seed_default_products,
+    _normalize_orders,
+    _create_sales_summaries,
+    _create_outbox,
+    _create_product_search,
+    _create_api_batches,
+    _create_inventory_ledger,
+    _add_order_delivery_charge,
+    _index_order_pincode,
+    _unlink_stock_movements,
+]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    # conn must be in autocommit mode (isolation_level=None)
+    applied = []
+    for version, step in enumerate(MIGRATIONS, start=1):
+        if schema_version(conn) >= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-check under the write lock: another process may have won
+            if schema_version(conn) >= version:
+                conn.execute("ROLLBACK")
+                continue
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        applied.append(step.__name__)
+    return applied
@@ -0,0 +1,223 @@
+import json
+import logging
+import threading
+import time
+import urllib.request
+from db import get_pool
+from perf import count, timer
+
+# ---------------- ORDER NOTIFICATIONS ----------------
+# db.place_order writes outbox rows in the order transaction. Worker threads
+# (started once per process) claim due rows in batches, hand them to the
+# sender registered for their kind, and mark them sent or schedule a retry
+# with exponential backoff. Checkout never waits for delivery.
+
+log = logging.getLogger("phenyl_shop.notify")
+
+WORKER_THREADS = 2
+BATCH_SIZE = 20
+POLL_INTERVAL = 2.0      # seconds between polls when the outbox is empty
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 5.0       # seconds; retry n waits BACKOFF_BASE * 2 ** (n - 1)
+BACKOFF_MAX = 3600.0
+LEASE_SECONDS = 120.0    # a claimed row not finished by then is claimed again
+
+
+# ---------------- SENDERS ----------------
+# A sender takes a Notification and raises on failure. Register real
+# gateways with set_sender(); the defaults only log.
+
+class Notification:
+
+    def __init__(self, id, kind, recipient, payload, attempts):
+        self.id = id
+        self.kind = kind
+        self.recipient = recipient
+        self.payload = payload
+        self.attempts = attempts
+
+
+class LogSender:
+
+    def send(self, notification):
+        log.info("%s to %s: %s", notification.kind, notification.recipient or "shop", notification.payload)
+
+
+class RecordingSender:
+    # Local stub: keeps what it was asked to send, optionally failing first
+
+    def __init__(self, fail_times=0):
+        self.sent = []
+        self.fail_times = fail_times
+        self._lock = threading.Lock()
+
+    def send(self, notification):
+        with self._lock:
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                raise RuntimeError("simulated gateway failure")
+            self.sent.append(notification)
+
+
+class WebhookSender:
+    # POSTs the notification as JSON, e.g. to an SMS/WhatsApp/email gateway
+
+    def __init__(self, url, timeout=10, headers=None):
+        self.url = url
+        self.timeout = timeout
+        self.headers = headers or {}
+
+    def send(self, notification):
+        body = json.dumps({"kind": notification.kind, "recipient": notification.recipient,
+                           **notification.payload}).encode()
+        request = urllib.request.Request(self.url, data=body, method="POST",
+                                         headers={"Content-Type": "application/json", **self.headers})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+_senders = {
+    "order_confirmation": LogSender(),
+    "admin_alert": LogSender(),
+}
+
+
+def set_sender(kind, sender):
+    _senders[kind] = sender
+
+
+# ---------------- OUTBOX ----------------
+def has_due(now=None):
+    # Cheap check on a reader (idx_outbox_due), so idle workers never take
+    # the write lock from the order writer just to find nothing to claim
+    now = time.time() if now is None else now
+    with get_pool().read() as conn:
+        return conn.execute("""
+            SELECT EXISTS(SELECT 1 FROM outbox WHERE status = 'pending' AND next_attempt_at <= ?)
+                OR EXISTS(SELECT 1 FROM outbox WHERE status = 'sending' AND claimed_at < ?)
+        """, (now, now - LEASE_SECONDS)).fetchone()[0]
+
+
+def claim_batch(limit=BATCH_SIZE):
+    now = time.time()
+    if not has_due(now):
+        return []
+    with get_pool().write() as conn:
+        rows = conn.execute("""
+            SELECT id, kind, recipient, payload, attempts FROM outbox
+            WHERE (status = 'pending' AND next_attempt_at <= ?)
+               OR (status = 'sending' AND claimed_at < ?)
+            ORDER BY next_attempt_at LIMIT ?
+        """, (now, now - LEASE_SECONDS, limit)).fetchall()
+        if rows:
+            conn.executemany("UPDATE outbox SET status = 'sending', claimed_at = ? WHERE id = ?",
+                             [(now, row[0]) for row in rows])
+    return [Notification(id, kind, recipient, json.loads(payload), attempts)
+            for id, kind, recipient, payload, attempts in rows]
+
+
+def _retry_delay(attempts):
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempts - 1))
+
+
+def deliver(batch):
+    sent = []
+    failed = []
+    for notification in batch:
+        sender = _senders.get(notification.kind)
+        try:
+            if sender is None:
+                raise LookupError(f"no sender for {notification.kind}")
+            with timer(f"notify.{notification.kind}"):
+                sender.send(notification)
+            sent.append(notification.id)
+        except Exception as e:
+            failed.append((notification, f"{type(e).__name__}: {e}"))
+
+    # Results for the whole batch are written in one transaction
+    now = time.time()
+    with get_pool().write() as conn:
+        conn.executemany("UPDATE outbox SET status = 'sent', attempts = attempts + 1, last_error = NULL WHERE id = ?",
+                         [(id,) for id in sent])
+        for notification, error in failed:
+            attempts = notification.attempts + 1
+            if attempts >= MAX_ATTEMPTS:
+                conn.execute("UPDATE outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                             (attempts, error, notification.id))
+            else:
+                conn.execute("""
+                    UPDATE outbox SET status = 'pending', attempts = ?, last_error = ?, next_attempt_at = ?
+                    WHERE id = ?
+                """, (attempts, error, now + _retry_delay(attempts), notification.id))
+    count("notify.sent", len(sent))
+    count("notify.failed", len(failed))
+    return len(sent), len(failed)
+
+
+def drain_once(limit=BATCH_SIZE):
+    # Claims and delivers one batch; returns (sent, failed)
+    batch = claim_batch(limit)
+    if not batch:
+        return 0, 0
+    return deliver(batch)
+
+
+def outbox_counts():
+    with get_pool().read() as conn:
+        return conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status ORDER BY status").fetchall()
+
+
+# ---------------- WORKER ----------------
+class OutboxWorker:
+
+    def __init__(self, threads=WORKER_THREADS, batch_size=BATCH_SIZE, poll_interval=POLL_INTERVAL):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=self._run, name=f"outbox-{i}", daemon=True)
+                         for i in range(threads)]
+
+    def start(self):
+        for t in self._threads:
+            t.start()
+        return self
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                sent, failed = drain_once(self.batch_size)
+            except Exception:
+                log.exception("outbox drain failed")
+                sent = failed = 0
+            if sent + failed < self.batch_size:
+                # Nothing more due right now: sleep until woken or next poll
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def start_outbox_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = OutboxWorker().start()
+    return _worker
+
+
+def wake_outbox():
+    # Call after placing an order so delivery starts without waiting a poll
+    if _worker is not None:
+        _worker.wake()
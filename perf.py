@@ -0,0 +1,140 @@
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ---------------- PERFORMANCE METRICS ----------------
+# Always-on timers for the hot paths. Each metric keeps its last
+# RING_SIZE samples (for rolling percentiles) plus lifetime count and sum.
+# Counters are plain running totals (e.g. reruns per page).
+
+RING_SIZE = 1000
+METRICS_PORT = os.environ.get("PHENYL_METRICS_PORT")  # unset = no HTTP endpoint
+
+_lock = threading.Lock()
+_samples = {}
+_totals = {}
+_counters = {}
+
+
+def record(name, seconds):
+    with _lock:
+        ring = _samples.get(name)
+        if ring is None:
+            ring = _samples[name] = deque(maxlen=RING_SIZE)
+            _totals[name] = [0, 0.0]
+        ring.append(seconds)
+        totals = _totals[name]
+        totals[0] += 1
+        totals[1] += seconds
+
+
+def count(name, amount=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+@contextmanager
+def timer(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def timed(name):
+    # Decorator form of timer()
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def _percentile(ordered, pct):
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def snapshot():
+    # [(name, samples in window, p50, p95, p99, lifetime count, lifetime sum)]
+    with _lock:
+        items = [(name, sorted(ring), list(_totals[name])) for name, ring in _samples.items()]
+    rows = []
+    for name, ordered, (total_count, total_sum) in sorted(items):
+        rows.append((name, len(ordered), _percentile(ordered, 50), _percentile(ordered, 95),
+                     _percentile(ordered, 99), total_count, total_sum))
+    return rows
+
+
+def counters():
+    with _lock:
+        return sorted(_counters.items())
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+        _totals.clear()
+        _counters.clear()
+
+
+# ---------------- PROMETHEUS EXPOSITION ----------------
+def _metric_name(name):
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text():
+    lines = [
+        "# HELP phenyl_shop_duration_seconds Hot path timings (rolling quantiles).",
+        "# TYPE phenyl_shop_duration_seconds summary",
+    ]
+    for name, _, p50, p95, p99, total_count, total_sum in snapshot():
+        op = _label(name)
+        for q, value in (("0.5", p50), ("0.95", p95), ("0.99", p99)):
+            lines.append(f'phenyl_shop_duration_seconds{{op="{op}",quantile="{q}"}} {value:.6f}')
+        lines.append(f'phenyl_shop_duration_seconds_sum{{op="{op}"}} {total_sum:.6f}')
+        lines.append(f'phenyl_shop_duration_seconds_count{{op="{op}"}} {total_count}')
+    for name, value in counters():
+        metric = "phenyl_shop_" + _metric_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=None, host="127.0.0.1"):
+    # Serves /metrics on a daemon thread; call once per process
+    port = int(port or METRICS_PORT)
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
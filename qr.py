@@ -0,0 +1,69 @@
+from functools import lru_cache
+from io import BytesIO
+from perf import count, timed
+
+# ---------------- UPI QR CODES ----------------
+# The payload only changes with the amount, so rendered codes are memoized
+# by the full upi://pay link. 4096 entries covers a few dozen products at
+# every quantity from 1 to 100 litres (~1 KB each as PNG).
+# qrcode (and PIL behind it) is imported on first use: only UPI orders need it.
+
+QR_CACHE_SIZE = 4096
+
+
+def _qr_matrix(data):
+    import qrcode
+    qr = qrcode.QRCode(border=4)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def _render_png(data):
+    import qrcode
+    img = qrcode.make(data)
+    buf = BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _render_svg(data):
+    # One stroked path, one segment per horizontal run of dark modules
+    matrix = _qr_matrix(data)
+    size = len(matrix)
+    parts = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if row[x]:
+                start = x
+                while x < size and row[x]:
+                    x += 1
+                parts.append(f"M{start} {y}.5h{x - start}")
+            else:
+                x += 1
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+            f'<rect width="{size}" height="{size}" fill="#fff"/>'
+            f'<path stroke="#000" d="{"".join(parts)}"/></svg>')
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def _render_qr(data, fmt):
+    if fmt == "svg":
+        return _render_svg(data)
+    return _render_png(data)
+
+
+@timed("qr.generate")
+def generate_qr(data, fmt="png"):
+    # PNG bytes, or an SVG string with fmt="svg". Hits and misses go to the
+    # qr.cache_hits / qr.cache_misses counters (Performance page, /metrics).
+    misses = _render_qr.cache_info().misses
+    result = _render_qr(data, fmt)
+    count("qr.cache_misses" if _render_qr.cache_info().misses > misses else "qr.cache_hits")
+    return result
+
+
+def qr_cache_info():
+    # hits, misses, maxsize, currsize
+    return _render_qr.cache_info()
@@ -0,0 +1,94 @@
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import time
+
+# ---------------- COLD START PROFILE ----------------
+# Measures what app.py pays at import time on a cold interpreter, using
+# python -X importtime. The import list is read from app.py's top-level
+# import statements, so the numbers follow the app across releases.
+#
+#   python startup_time.py            # table
+#   python startup_time.py --json     # for comparing releases
+#   python startup_time.py --deferred # also time the lazily imported packages
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_FILE = os.path.join(BASE_DIR, "app.py")
+DEFERRED = ["pandas", "numpy", "qrcode", "PIL.Image"]
+
+
+def app_imports(path=APP_FILE):
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def profile_imports(modules):
+    # Fresh interpreter per run so nothing is already cached in sys.modules
+    code = "; ".join(f"import {m}" for m in modules)
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=BASE_DIR, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    # Lines look like "import time:   self [us] |  cumulative | package";
+    # top-level imports are the ones without leading spaces in the name
+    totals = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith("  "):
+            continue
+        root = name.strip().split(".")[0]
+        totals[root] = totals.get(root, 0) + int(cumulative) / 1e6
+    return wall, totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time breakdown for app.py")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    parser.add_argument("--deferred", action="store_true",
+                        help="also measure the packages app.py now imports lazily")
+    args = parser.parse_args(argv)
+
+    modules = app_imports()
+    wall, totals = profile_imports(modules)
+    # Anything not imported by app.py (site, encodings, ...) is interpreter startup
+    roots = {m.split(".")[0] for m in modules}
+    app_totals = {name: sec for name, sec in totals.items() if name in roots}
+    report = {
+        "python": sys.version.split()[0],
+        "modules": modules,
+        "process_wall_s": round(wall, 3),
+        "interpreter_s": round(sum(totals.values()) - sum(app_totals.values()), 3),
+        "import_s": round(sum(app_totals.values()), 3),
+        "breakdown_s": {name: round(sec, 4) for name, sec in sorted(app_totals.items(), key=lambda kv: -kv[1])},
+    }
+    if args.deferred:
+        report["deferred_s"] = {m: round(profile_imports([m])[1].get(m.split(".")[0], 0), 4) for m in DEFERRED}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"app.py imports: {report['import_s']:.3f}s "
+          f"(interpreter startup {report['interpreter_s']:.3f}s, process wall {report['process_wall_s']:.3f}s)")
+    for name, sec in report["breakdown_s"].items():
+        print(f"  {name:<24}{sec * 1000:9.1f} ms")
+    for name, sec in report.get("deferred_s", {}).items():
+        print(f"  {name + ' (deferred)':<24}{sec * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
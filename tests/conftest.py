@@ -0,0 +1,32 @@
+import os
+import sys
+import pytest
+
+# The app modules live one folder up, next to app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import archive
+import db
+
+
+@pytest.fixture
+def shop_db(tmp_path, monkeypatch):
+    # A fresh database file (and archive folder) per test. The pool, writer
+    # thread and catalog are per process, so they are reset around each test.
+    path = str(tmp_path / "shop.db")
+    monkeypatch.setattr(db, "DB_PATH", path)
+    monkeypatch.setattr(archive, "DB_PATH", path)
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    _reset()
+    yield path
+    _reset()
+
+
+def _reset():
+    if db._pool is not None:
+        db._pool.close()
+    db._pool = None
+    db._writer = None
+    db._catalog = None
+    db._search_cache.clear()
+    db.invalidate_catalog()
@@ -0,0 +1,59 @@
+import pytest
+import api
+import db
+
+
+def _body(key="PO-1", quantity=4, **line):
+    return {
+        "idempotency_key": key,
+        "customer": {"name": "Ravi Traders", "phone": "9000000001", "address": "Chennai", "pincode": "600116"},
+        "lines": [dict(line or {"product": "Test Phenyl"}, quantity=quantity)],
+    }
+
+
+@pytest.fixture
+def product_id(shop_db, monkeypatch):
+    monkeypatch.setattr(api, "get_zone_index", lambda: None)
+    return db.add_product("Test Phenyl", 80, 100)
+
+
+# ---------------- IDEMPOTENT BATCHES ----------------
+def test_replayed_batch_returns_the_stored_result(product_id):
+    status, first, replayed = api.submit_batch(_body())
+    assert (status, first["status"], replayed) == (200, "accepted", False)
+
+    status, again, replayed = api.submit_batch(_body())
+    assert (status, replayed) == (200, True)
+    assert again == first
+    assert db.count_orders() == 1
+    assert db.get_stock(product_id) == 96
+
+
+def test_reused_key_with_a_different_body_conflicts(product_id):
+    api.submit_batch(_body())
+    status, result, replayed = api.submit_batch(_body(quantity=5))
+    assert (status, result["status"], replayed) == (409, "conflict", True)
+    assert db.count_orders() == 1
+
+
+def test_rejected_batch_books_nothing_and_can_be_retried(product_id):
+    status, result, _ = api.submit_batch(_body(quantity=101))
+    assert (status, result["status"]) == (409, "rejected")
+    assert db.count_orders() == 0
+    # A rejection is not stored, so the same key works once stock is there
+    db.record_stock_movement(product_id, "restock", 10)
+    status, result, replayed = api.submit_batch(_body(quantity=101))
+    assert (status, result["status"], replayed) == (200, "accepted", False)
+
+
+@pytest.mark.parametrize("line", [
+    {"product_id": 1, "quantity": 10 ** 30},
+    {"product_id": 10 ** 30, "quantity": 1},
+    {"product_id": 1, "quantity": 0},
+    {"product_id": True, "quantity": 1},
+])
+def test_out_of_range_lines_are_bad_requests(product_id, line):
+    body = _body()
+    body["lines"] = [line]
+    with pytest.raises(api.BadRequest):
+        api.parse_batch(body)
@@ -0,0 +1,157 @@
+import sqlite3
+import threading
+import pytest
+import archive
+import db
+from migrations import MIGRATIONS
+
+
+# ---------------- MIGRATIONS ----------------
+def _legacy_database(path):
+    # The schema app.py created before versioned migrations, with the kind
+    # of data real shops ended up with: duplicate product names (one of
+    # which collides with the "<name> #<id>" rename) and existing orders
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE products(id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, price INTEGER, stock INTEGER)")
+    conn.execute("""CREATE TABLE orders(id INTEGER PRIMARY KEY AUTOINCREMENT, customer_name TEXT, phone TEXT,
+                    address TEXT, pincode TEXT, product TEXT, quantity INTEGER, total_price INTEGER,
+                    payment_method TEXT, upi_id TEXT)""")
+    conn.executemany("INSERT INTO products(name, price, stock) VALUES(?,?,?)", [
+        ("Lemon Phenyl", 80, 50),
+        ("Lemon Phenyl #3", 80, 5),
+        ("Lemon Phenyl", 80, 7),
+        ("Pine Phenyl", 90, 40),
+    ])
+    conn.executemany("""INSERT INTO orders(customer_name, phone, address, pincode, product, quantity,
+                        total_price, payment_method, upi_id) VALUES(?,?,?,?,?,?,?,?,?)""", [
+        ("Ravi", "9000000001", "Chennai", "600116", "Lemon Phenyl", 2, 160, "Cash On Delivery", ""),
+        ("Mala", "9000000002", "Chennai", "600001", "Pine Phenyl", 1, 90, "UPI Payment", "shop@upi"),
+    ])
+    conn.commit()
+    conn.close()
+
+
+def test_legacy_database_upgrades_with_duplicate_names(shop_db):
+    _legacy_database(shop_db)
+
+    with db.get_pool().read() as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+        names = [row[0] for row in conn.execute("SELECT name FROM products ORDER BY id")]
+        orders = conn.execute("SELECT product_id, product, total_price FROM orders ORDER BY id").fetchall()
+
+    assert len(names) == len(set(names))
+    assert names[:2] == ["Lemon Phenyl", "Lemon Phenyl #3"]
+    assert names[2].startswith("Lemon Phenyl #3")
+    # Orders point at the first product with their name and keep their totals
+    assert orders == [(1, "Lemon Phenyl", 160), (4, "Pine Phenyl", 90)]
+    # Stock moved into the ledger as opening movements
+    assert [db.get_stock(pid) for pid in (1, 2, 3, 4)] == [50, 5, 7, 40]
+
+
+# ---------------- ORDERS AND GROUP COMMIT ----------------
+def _order(product_id, quantity=1, **kwargs):
+    return db.place_order("Ravi", "9000000001", "Chennai", "600116", product_id, quantity,
+                          80 * quantity, "Cash On Delivery", "", **kwargs)
+
+
+def test_concurrent_orders_never_oversell(shop_db):
+    product_id = db.add_product("Test Phenyl", 80, 10)
+    results = []
+    start = threading.Barrier(30)
+
+    def buyer():
+        start.wait()
+        results.append(_order(product_id))
+
+    threads = [threading.Thread(target=buyer) for _ in range(30)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    placed = [order_id for order_id in results if order_id is not None]
+    assert len(placed) == 10
+    assert db.get_stock(product_id) == 0
+    assert db.count_orders(product_id=product_id) == 10
+    sold = db.fetchall("SELECT SUM(quantity) FROM stock_movements WHERE product_id = ? AND kind = 'sale'", (product_id,))
+    assert sold[0][0] == -10
+
+
+def test_failed_write_rolls_back_alone(shop_db):
+    db.get_pool()
+
+    def bad(cur):
+        cur.execute("INSERT INTO api_batches(idempotency_key, request_hash, response) VALUES('bad', 'h', '{}')")
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        db.run_write(bad)
+    assert db.run_write(lambda cur: cur.execute(
+        "INSERT INTO api_batches(idempotency_key, request_hash, response) VALUES('good', 'h', '{}')").rowcount) == 1
+    keys = db.fetchall("SELECT idempotency_key FROM api_batches")
+    assert keys == [("good",)]
+
+
+def test_run_write_raises_when_writer_is_not_running(shop_db, monkeypatch):
+    monkeypatch.setattr(db, "_writer", db.GroupCommitWriter(db.get_pool()))  # never started
+    with pytest.raises(RuntimeError, match="not running"):
+        db.run_write(lambda cur: None)
+
+
+def test_run_write_timeout_cancels_unstarted_write(shop_db):
+    pool = db.get_pool()
+    ran = threading.Event()
+    db.run_write(lambda cur: None)  # writer thread is up
+    pool._write_lock.acquire()
+    try:
+        with pytest.raises(RuntimeError, match="nothing was written"):
+            db.run_write(lambda cur: ran.set(), timeout=0.2)
+    finally:
+        pool._write_lock.release()
+    # The writer moves on once the lock is free and skips the cancelled op
+    assert db.run_write(lambda cur: "after") == "after"
+    assert not ran.is_set()
+
+
+# ---------------- ARCHIVE ----------------
+def _age_orders(order_ids, created_at):
+    marks = ",".join("?" * len(order_ids))
+    db.run_write(lambda cur: cur.execute(f"UPDATE orders SET created_at = ? WHERE id IN ({marks})",
+                                         [created_at] + list(order_ids)))
+
+
+def test_archive_moves_old_orders_and_history_pages_across_files(shop_db):
+    product_id = db.add_product("Test Phenyl", 80, 100)
+    order_ids = [_order(product_id) for _ in range(7)]
+    _age_orders(order_ids[:2], "2020-01-15 10:00:00")
+    _age_orders(order_ids[2:4], "2020-02-15 10:00:00")
+
+    result = archive.run_archive(30, vacuum=False)
+    assert result["moved"] == {"2020-01": 2, "2020-02": 2}
+    assert [month for month, _ in archive.list_archives()] == ["2020-02", "2020-01"]
+    assert db.count_orders() == 3
+    assert archive.count_order_history() == 7
+    # Running again finds nothing left to move
+    assert archive.run_archive(30, vacuum=False)["moved"] == {}
+
+    seen = []
+    before_id = None
+    while True:
+        page = archive.query_order_history(before_id=before_id, page_size=3)
+        if not page:
+            break
+        seen += [row[0] for row in page]
+        before_id = page[-1][0]
+    assert seen == sorted(order_ids, reverse=True)
+
+
+def test_archived_orders_keep_their_ledger_link(shop_db):
+    product_id = db.add_product("Test Phenyl", 80, 100)
+    order_id = _order(product_id, quantity=3)
+    _age_orders([order_id], "2020-01-15 10:00:00")
+
+    archive.run_archive(30, vacuum=False)
+    assert db.count_orders() == 0
+    rows = db.fetchall("SELECT order_id, quantity FROM stock_movements WHERE kind = 'sale'")
+    assert rows == [(order_id, -3)]
+    assert db.get_stock(product_id) == 97
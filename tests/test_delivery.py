@@ -0,0 +1,27 @@
+import pytest
+import delivery
+
+
+# ---------------- PINCODES ----------------
+@pytest.mark.parametrize("pincode", ["600116", "110001"])
+def test_valid_pincodes(pincode):
+    assert delivery.is_valid_pincode(pincode)
+
+
+@pytest.mark.parametrize("pincode", ["", "60011", "6001160", "060011", "60011a", "60011²", "²²0001"])
+def test_invalid_pincodes(pincode):
+    assert not delivery.is_valid_pincode(pincode)
+
+
+def test_lookup_ignores_non_ascii_digits():
+    index = delivery.ZoneIndex([(600116, "Chennai City", 0, 1)])
+    assert index.lookup("600116").name == "Chennai City"
+    assert index.lookup("60011²") is None
+
+
+# ---------------- ZONES FILE ----------------
+def test_empty_zones_file_is_an_error(tmp_path):
+    path = tmp_path / "zones.csv"
+    path.write_text("pincode,zone,charge,eta_days\n")
+    with pytest.raises(ValueError, match="no valid pincodes"):
+        delivery.load_zone_index(str(path))
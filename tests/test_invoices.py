@@ -0,0 +1,17 @@
+from invoices import amount_due, tax_lines
+
+
+def _order(pincode, total_price=118, delivery_charge=0):
+    return (1, "Ravi", "9000000001", "Chennai", pincode, "Pine Phenyl", 1, total_price,
+            "Cash On Delivery", "", "2026-01-01 10:00:00", delivery_charge)
+
+
+# ---------------- TAX ----------------
+def test_tax_lines_split_by_state():
+    assert [label for label, _ in tax_lines(_order("600116"))[1]] == ["CGST @ 9%", "SGST @ 9%"]
+    assert [label for label, _ in tax_lines(_order("110001"))[1]] == ["IGST @ 18%"]
+    assert [label for label, _ in tax_lines(_order("²²0001"))[1]] == ["IGST @ 18%"]
+
+
+def test_amount_due_includes_delivery():
+    assert amount_due(_order("600116", total_price=160, delivery_charge=40)) == 200